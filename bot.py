@@ -9,12 +9,14 @@ import os
 from dotenv import load_dotenv
 from aiohttp import web
 import logging
-from datetime import datetime, timedelta
-import pytz
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 import asyncio
+import hashlib
+import json
+import random
 from database import Database
-from locales import LANGUAGES
+from locales import LANGUAGES, LANGUAGES_FLAT
 from bot_config import (
     WAR_POLL_CHECK_INTERVAL,
     WAR_REMINDER_CHECK_INTERVAL,
@@ -24,7 +26,7 @@ from bot_config import (
     DISCORD_TOKEN
 )
 from utils.war_helpers import get_current_poll_week, get_war_config, DAY_MAP
-from utils.helpers import get_discord_timestamp
+from utils.helpers import get_timezone, join_mentions
 
 # Configure logging
 logging.basicConfig(
@@ -51,14 +53,16 @@ DB_FILE = DATA_DIR / "bot_data.db"
 
 # Initialize database
 db = Database(str(DB_FILE))
-logger.info(f"✅ Database initialized at {DB_FILE}")
+# Shared with the cogs so the whole bot uses one connection pool
+bot.db = db
+logger.info("✅ Database initialized at %s", DB_FILE)
 
 
 async def guild_only_interaction(interaction: discord.Interaction) -> bool:
     """Require slash commands to be used in a guild (not DMs)."""
     if interaction.guild_id is None:
         await interaction.response.send_message(
-            LANGUAGES['en'].get('dm_only', 'This command can only be used in a server.'),
+            LANGUAGES_FLAT.get(('en', 'dm_only'), 'This command can only be used in a server.'),
             ephemeral=True
         )
         return False
@@ -73,7 +77,7 @@ bot.tree.interaction_check = guild_only_interaction
 @bot.tree.error
 async def on_app_command_error(interaction: discord.Interaction, error: discord.app_commands.AppCommandError):
     """Global error handler for application commands"""
-    logger.error(f"Command error in {interaction.command.name if interaction.command else 'unknown'}: {error}", exc_info=error)
+    logger.error("Command error in %s: %s", interaction.command.name if interaction.command else 'unknown', error, exc_info=error)
     
     # Send user-friendly error message
     error_message = "❌ Something went wrong while processing your command. Please try again later."
@@ -94,7 +98,7 @@ async def on_app_command_error(interaction: discord.Interaction, error: discord.
         else:
             await interaction.response.send_message(error_message, ephemeral=True)
     except Exception as e:
-        logger.error(f"Failed to send error message: {e}")
+        logger.error("Failed to send error message: %s", e)
 
 
 # ==================== OWNER-ONLY COMMANDS ====================
@@ -111,38 +115,54 @@ async def leave_guild(ctx, guild_id: int):
     await ctx.send(f"✅ Left guild **{guild.name}** (`{guild_id}`).")
 
 
+# ==================== COMMAND SYNC ====================
+
+# Hash of the last synced command tree, so restarts without changes skip the sync calls
+CMD_HASH_FILE = DATA_DIR / ".cmd_hash"
+
+
+def command_tree_hash() -> str:
+    """Hash the slash command definitions plus the connected guilds they get copied to."""
+    payload = {
+        "commands": [cmd.to_dict(bot.tree) for cmd in bot.tree.get_commands()],
+        "guilds": sorted(guild.id for guild in bot.guilds),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
 # ==================== BOT EVENTS ====================
 
 @bot.event
 async def on_ready():
     """Bot ready event"""
-    logger.info(f"✅ Logged in as {bot.user} (ID: {bot.user.id})")
-    logger.info(f"✅ Connected to {len(bot.guilds)} guilds")
+    logger.info("✅ Logged in as %s (ID: %s)", bot.user, bot.user.id)
+    logger.info("✅ Connected to %s guilds", len(bot.guilds))
     
     # Re-register persistent views
     await register_persistent_views()
     
-    # Sync commands
+    # Sync commands (skipped when neither the commands nor the guild list changed)
     # Guild-copy = instant, Global = up to 1 hour to propagate
     try:
-        # 1. Copy global commands into every connected guild → shows up instantly
-        for guild in bot.guilds:
-            bot.tree.copy_global_to(guild=guild)
-            await bot.tree.sync(guild=guild)
-        # 2. Also do global sync for guilds the bot joins later
-        synced = await bot.tree.sync()
-        logger.info(f"✅ Synced {len(synced)} command(s) globally + instant-synced to {len(bot.guilds)} guild(s)")
+        cmd_hash = command_tree_hash()
+        if CMD_HASH_FILE.exists() and CMD_HASH_FILE.read_text().strip() == cmd_hash:
+            logger.info("✅ Commands unchanged since last sync, skipping (use /synccommands to force)")
+        else:
+            # 1. Copy global commands into every connected guild → shows up instantly
+            for guild in bot.guilds:
+                bot.tree.copy_global_to(guild=guild)
+                await bot.tree.sync(guild=guild)
+            # 2. Also do global sync for guilds the bot joins later
+            synced = await bot.tree.sync()
+            CMD_HASH_FILE.write_text(cmd_hash)
+            logger.info("✅ Synced %s command(s) globally + instant-synced to %s guild(s)", len(synced), len(bot.guilds))
     except Exception as e:
-        logger.error(f"❌ Failed to sync commands: {e}")
+        logger.error("❌ Failed to sync commands: %s", e)
     
     # Start background tasks
-    if not check_war_poll_schedule.is_running():
-        check_war_poll_schedule.start()
-        logger.info("✅ Started war poll scheduler task")
-    
-    if not check_war_reminders.is_running():
-        check_war_reminders.start()
-        logger.info("✅ Started war reminders task")
+    if not check_war_schedule.is_running():
+        check_war_schedule.start()
+        logger.info("✅ Started war poll & reminder scheduler task")
     
     if not cleanup_old_data.is_running():
         cleanup_old_data.start()
@@ -154,8 +174,16 @@ async def on_ready():
     logger.info("✅ Bot is ready!")
 
 
+_views_registered = False
+
+
 async def register_persistent_views():
     """Register all persistent views that should survive bot restarts"""
+    global _views_registered
+    # on_ready fires again after every reconnect; the views only need adding once
+    if _views_registered:
+        return
+
     from views.profile_views import ProfileSetupButton
     from views.join_views import JoinRequestButton, AdminApprovalView
     from views.build_views import BuildSelectView
@@ -177,219 +205,190 @@ async def register_persistent_views():
     # Register build select view
     bot.add_view(BuildSelectView(db, LANGUAGES))
     
+    _views_registered = True
     logger.info("✅ Persistent views registered")
 
 
 @bot.event
 async def on_guild_join(guild):
     """Handle bot joining a new guild"""
-    logger.info(f"✅ Joined new guild: {guild.name} (ID: {guild.id})")
+    logger.info("✅ Joined new guild: %s (ID: %s)", guild.name, guild.id)
 
 
 @bot.event
 async def on_guild_remove(guild):
     """Handle bot leaving a guild"""
-    logger.info(f"❌ Left guild: {guild.name} (ID: {guild.id})")
+    logger.info("❌ Left guild: %s (ID: %s)", guild.name, guild.id)
 
 
 # ==================== BACKGROUND TASKS ====================
 
-async def post_war_poll_to_channel(channel: discord.TextChannel, guild_id: int, config: dict):
-    """Build and send the war poll embed + buttons to the given channel."""
-    from cogs.war import WarPollView
-    from utils.helpers import get_discord_timestamp
-    from locales import LANGUAGES
-
-    guild_timezone = config.get("timezone", "Africa/Cairo")
-    import pytz
-    now = datetime.now(pytz.timezone(guild_timezone))
-    current_weekday = now.weekday()
-
-    # Days until next Saturday (5)
-    days_to_saturday = (5 - current_weekday) % 7 or 7 if current_weekday != 5 else 0
-    days_to_sunday = (6 - current_weekday) % 7 or 7 if current_weekday != 6 else 0
-
-    saturday_time = get_discord_timestamp(
-        config["saturday_war"]["hour"],
-        config["saturday_war"]["minute"],
-        days_to_saturday,
-        guild_timezone
-    )
-    sunday_time = get_discord_timestamp(
-        config["sunday_war"]["hour"],
-        config["sunday_war"]["minute"],
-        days_to_sunday,
-        guild_timezone
-    )
-
-    # Build embed using English as default for auto-posts
-    # (guild language will apply for buttons via get_text per user)
-    lang = db.get_server_settings(guild_id).get('language', 'en')
-    L = LANGUAGES.get(lang, LANGUAGES['en'])
-
-    embed = discord.Embed(
-        title=L.get("war_poll_title", "⚔️ War Poll"),
-        description=L.get("war_poll_desc", "Vote for which day(s) you'll participate in war!"),
-        color=discord.Color.red()
-    )
-    embed.add_field(
-        name=f"📅 {L.get('saturday', 'Saturday')}",
-        value=f"⏰ {saturday_time}",
-        inline=True
-    )
-    embed.add_field(
-        name=f"📅 {L.get('sunday', 'Sunday')}",
-        value=f"⏰ {sunday_time}",
-        inline=True
-    )
-    embed.add_field(
-        name="ℹ️",
-        value=L.get("use_warlist", "Use /warlist to see who signed up"),
-        inline=False
-    )
-    embed.set_footer(text=L.get("times_local", "Times shown in your local timezone"))
-
-    view = WarPollView(guild_id, db)
-    await channel.send(embed=embed, view=view)
-
-
-@tasks.loop(minutes=WAR_POLL_CHECK_INTERVAL)
-async def check_war_poll_schedule():
-    """Check if it's time to post war polls"""
-    try:
-        now_utc = datetime.now(pytz.UTC)
+async def post_war_poll_to_channel(channel: discord.TextChannel, guild_id: int, config: dict) -> bool:
+    """Build and send the war poll embed + buttons to the given channel; returns whether it was sent."""
+    from cogs.war import send_war_poll
 
-        for guild in bot.guilds:
-            try:
-                config = get_war_config(db, guild.id)
-                channel_id = config.get("war_channel_id")
+    events = await db.async_run(db.get_war_events, guild_id, active_only=True)
+    if not events:
+        # Not recorded as sent, so an event enabled later in the day still gets its poll
+        logger.debug("No active war events for guild %s, skipping auto-poll", guild_id)
+        return False
 
-                if not channel_id:
-                    continue
+    # No user here, so texts resolve to the guild's server language
+    await send_war_poll(channel, db, guild_id, events, config.get("timezone", "Africa/Cairo"))
+    return True
 
-                # Get guild timezone
-                tz = pytz.timezone(config.get("timezone", "Africa/Cairo"))
-                now_local = now_utc.astimezone(tz)
 
-                # Check if it's poll day and time
-                poll_day = config.get("poll_day", "Friday")
-                poll_hour = config["poll_time"]["hour"]
-                poll_minute = config["poll_time"]["minute"]
-
-                # Map day names to weekday numbers
-                day_map = {
-                    "Monday": 0, "Tuesday": 1, "Wednesday": 2, "Thursday": 3,
-                    "Friday": 4, "Saturday": 5, "Sunday": 6
-                }
-
-                if now_local.weekday() == day_map.get(poll_day, 4):
-                    if now_local.hour == poll_hour and now_local.minute == poll_minute:
-                        poll_week = get_current_poll_week()
-                        if not db.was_event_sent(guild.id, "war_poll", poll_week):
-                            channel = guild.get_channel(channel_id)
-                            if channel:
-                                logger.info(f"📅 Auto-posting war poll for {guild.name}")
-                                await post_war_poll_to_channel(channel, guild.id, config)
-                                db.mark_event_sent(guild.id, "war_poll", poll_week)
+# Polls and reminders share one loop so each tick reads a guild's config once
+_SCHEDULE_INTERVAL = min(WAR_POLL_CHECK_INTERVAL, WAR_REMINDER_CHECK_INTERVAL)
 
-            except Exception as e:
-                logger.error(f"Error checking war poll for guild {guild.id}: {e}")
 
-    except Exception as e:
-        logger.error(f"Error in war poll scheduler: {e}")
+# (guild_id, event_key) pairs known to be sent for _sent_week, so once something has gone
+# out the remaining ticks of the week skip the was_event_sent query
+_sent_week = None
+_sent_keys: set = set()
+
+
+async def event_already_sent(guild_id: int, event_key: str, poll_week: str) -> bool:
+    """was_event_sent with an in-process memo of positive answers for the current poll week."""
+    global _sent_week
+    if _sent_week != poll_week:
+        _sent_week = poll_week
+        _sent_keys.clear()
+    if (guild_id, event_key) in _sent_keys:
+        return True
+    if await db.async_run(db.was_event_sent, guild_id, event_key, poll_week):
+        _sent_keys.add((guild_id, event_key))
+        return True
+    return False
 
 
+async def record_event_sent(guild_id: int, event_key: str, poll_week: str):
+    """Persist that an event was sent and remember it for the rest of the week."""
+    await db.async_run(db.mark_event_sent, guild_id, event_key, poll_week)
+    if _sent_week == poll_week:
+        _sent_keys.add((guild_id, event_key))
 
-@tasks.loop(minutes=WAR_REMINDER_CHECK_INTERVAL)
-async def check_war_reminders():
-    """Check if it's time to send war reminders — loops over all active war events in DB"""
+
+async def maybe_post_war_poll(guild: discord.Guild, config: dict, now_local: datetime, poll_week: str):
+    """Post the weekly war poll if it is the configured day and time."""
+    poll_hour = config["poll_time"]["hour"]
+    poll_minute = config["poll_time"]["minute"]
+
+    if now_local.weekday() != config["poll_weekday"]:
+        return
+    # Due from the configured time onwards (a late tick still posts); was_event_sent keeps it once a week
+    if now_local < now_local.replace(hour=poll_hour, minute=poll_minute, second=0, microsecond=0):
+        return
+
+    if await event_already_sent(guild.id, "war_poll", poll_week):
+        return
+
+    channel = guild.get_channel(config["war_channel_id"])
+    if channel:
+        if await post_war_poll_to_channel(channel, guild.id, config):
+            logger.info("📅 Auto-posted war poll for %s", guild.name)
+            await record_event_sent(guild.id, "war_poll", poll_week)
+
+
+async def send_due_war_reminders(guild: discord.Guild, config: dict, now_local: datetime, poll_week: str):
+    """Send reminders for every active war event whose reminder time has passed but which hasn't started."""
+    tz_name = config.get("timezone", "Africa/Cairo")
+    reminder_hours = config.get("reminder_hours", 2)
+    today_wd = now_local.weekday()
+
+    # Fetch all active war events for this guild
+    events = await db.async_run(db.get_war_events, guild.id, active_only=True)
+    playing_by_event = None
+
+    for event in events:
+        event_name = event["name"]
+        event_wd = DAY_MAP.get(event["day_of_week"], 5)
+
+        # Only check on the correct weekday
+        if today_wd != event_wd:
+            continue
+
+        war_time = now_local.replace(
+            hour=event["war_hour"],
+            minute=event["war_minute"],
+            second=0, microsecond=0
+        )
+        remind_at = war_time - timedelta(hours=reminder_hours)
+
+        # Due between the reminder time and the war start, so a delayed tick can't skip it
+        if not (remind_at <= now_local < war_time):
+            continue
+
+        # Use a slug-safe event key to avoid duplicate reminders
+        event_key = f"evt_reminder_{event_name.replace(' ', '_')}"
+        if await event_already_sent(guild.id, event_key, poll_week):
+            continue
+
+        channel = guild.get_channel(config["war_channel_id"])
+        if not channel:
+            continue
+
+        # Fetch "playing" votes for every event once, on the first reminder that is due
+        if playing_by_event is None:
+            playing_by_event = await db.async_run(db.get_playing_ids_by_event, guild.id, poll_week)
+        playing_ids = playing_by_event.get(event_name, [])
+
+        embed = discord.Embed(
+            title=f"⚔️ {event_name} — War Reminder!",
+            description=(
+                f"📅 **{event['day_of_week']}** at "
+                f"**{event['war_hour']:02d}:{event['war_minute']:02d}** ({tz_name})\n\n"
+                f"⏰ War starts in **{reminder_hours} hour(s)**!"
+            ),
+            color=discord.Color.red()
+        )
+
+        if playing_ids:
+            embed.add_field(
+                name=f"✅ Signed Up ({len(playing_ids)})",
+                value=join_mentions(playing_ids),
+                inline=False
+            )
+        else:
+            embed.add_field(
+                name="⚠️ No sign-ups yet",
+                value="Nobody has voted for this war. Use `/warpoll` to post a poll!",
+                inline=False
+            )
+
+        try:
+            await channel.send(embed=embed)
+            await record_event_sent(guild.id, event_key, poll_week)
+            logger.info("⚔️ Reminder sent for '%s' in %s", event_name, guild.name)
+        except Exception as e:
+            logger.error("Failed to send reminder for %s in %s: %s", event_name, guild.name, e)
+
+
+@tasks.loop(minutes=_SCHEDULE_INTERVAL)
+async def check_war_schedule():
+    """Post due war polls and reminders — one config read per guild per tick"""
     try:
-        now_utc = datetime.now(pytz.UTC)
+        now_utc = datetime.now(timezone.utc)
+        poll_week = get_current_poll_week()
 
         for guild in bot.guilds:
             try:
-                config = get_war_config(db, guild.id)
-                channel_id = config.get("war_channel_id")
-                if not channel_id:
+                config = await db.async_run(get_war_config, db, guild.id)
+                if not config.get("war_channel_id"):
                     continue
 
-                tz_name = config.get("timezone", "Africa/Cairo")
-                tz = pytz.timezone(tz_name)
+                # Get guild timezone
+                tz = get_timezone(config.get("timezone", "Africa/Cairo"))
                 now_local = now_utc.astimezone(tz)
-                reminder_hours = config.get("reminder_hours", 2)
-                window_secs = 60 * WAR_REMINDER_CHECK_INTERVAL
-                poll_week = get_current_poll_week()
-
-                # Fetch all active war events for this guild
-                events = db.get_war_events(guild.id, active_only=True)
-
-                for event in events:
-                    event_name = event["name"]
-                    event_wd = DAY_MAP.get(event["day_of_week"], 5)
-
-                    # Only check on the correct weekday
-                    if now_local.weekday() != event_wd:
-                        continue
-
-                    war_time = now_local.replace(
-                        hour=event["war_hour"],
-                        minute=event["war_minute"],
-                        second=0, microsecond=0
-                    )
-                    remind_at = war_time - timedelta(hours=reminder_hours)
-
-                    if abs((now_local - remind_at).total_seconds()) >= window_secs:
-                        continue
-
-                    # Use a slug-safe event key to avoid duplicate reminders
-                    event_key = f"evt_reminder_{event_name.replace(' ', '_')}"
-                    if db.was_event_sent(guild.id, event_key, poll_week):
-                        continue
-
-                    channel = guild.get_channel(channel_id)
-                    if not channel:
-                        continue
-
-                    # Fetch players who voted "playing" for this event
-                    votes = db.get_war_votes(guild.id, event_name, poll_week)
-                    playing_ids = [v["user_id"] for v in votes if v["playing"]]
-
-                    embed = discord.Embed(
-                        title=f"⚔️ {event_name} — War Reminder!",
-                        description=(
-                            f"📅 **{event['day_of_week']}** at "
-                            f"**{event['war_hour']:02d}:{event['war_minute']:02d}** ({tz_name})\n\n"
-                            f"⏰ War starts in **{reminder_hours} hour(s)**!"
-                        ),
-                        color=discord.Color.red()
-                    )
-
-                    if playing_ids:
-                        mentions = " ".join(f"<@{pid}>" for pid in playing_ids)
-                        embed.add_field(
-                            name=f"✅ Signed Up ({len(playing_ids)})",
-                            value=mentions[:1020],
-                            inline=False
-                        )
-                    else:
-                        embed.add_field(
-                            name="⚠️ No sign-ups yet",
-                            value="Nobody has voted for this war. Use `/warpoll` to post a poll!",
-                            inline=False
-                        )
-
-                    try:
-                        await channel.send(embed=embed)
-                        db.mark_event_sent(guild.id, event_key, poll_week)
-                        logger.info(f"⚔️ Reminder sent for '{event_name}' in {guild.name}")
-                    except Exception as e:
-                        logger.error(f"Failed to send reminder for {event_name} in {guild.name}: {e}")
+
+                await maybe_post_war_poll(guild, config, now_local, poll_week)
+                await send_due_war_reminders(guild, config, now_local, poll_week)
 
             except Exception as e:
-                logger.error(f"Error checking war reminders for guild {guild.id}: {e}")
+                logger.error("Error checking war schedule for guild %s: %s", guild.id, e)
 
     except Exception as e:
-        logger.error(f"Error in war reminder task: {e}")
+        logger.error("Error in war scheduler: %s", e)
 
 
 @tasks.loop(hours=CLEANUP_INTERVAL_HOURS)
@@ -404,21 +403,25 @@ async def cleanup_old_data():
         # Clean up old events for all guilds
         for guild in bot.guilds:
             try:
-                db.clear_old_events(guild.id, cutoff_date)
+                await db.async_run(db.clear_old_events, guild.id, cutoff_date)
             except Exception as e:
-                logger.error(f"Error cleaning up data for guild {guild.id}: {e}")
+                logger.error("Error cleaning up data for guild %s: %s", guild.id, e)
         
         logger.info("✅ Cleanup task completed")
     
     except Exception as e:
-        logger.error(f"Error in cleanup task: {e}")
+        logger.error("Error in cleanup task: %s", e)
 
 
 # ==================== WEB SERVER FOR HEALTH CHECKS ====================
 
+_HEALTH_BODY = b"OK"
+
+
 async def health_check(request):
     """Health check endpoint"""
-    return web.Response(text="OK", status=200)
+    # aiohttp needs a fresh Response per request, but the body bytes can be shared
+    return web.Response(body=_HEALTH_BODY, status=200, content_type="text/plain")
 
 
 async def start_web_server():
@@ -427,16 +430,18 @@ async def start_web_server():
     app.router.add_get("/", health_check)
     app.router.add_get("/health", health_check)
     
-    runner = web.AppRunner(app)
+    # Platform probes hit this constantly; skip the per-request access log line and
+    # drop idle probe connections after 15s instead of aiohttp's hour-long keep-alive
+    runner = web.AppRunner(app, access_log=None, keepalive_timeout=15, shutdown_timeout=5)
     await runner.setup()
     
     site = web.TCPSite(runner, "0.0.0.0", WEB_SERVER_PORT)
     
     try:
         await site.start()
-        logger.info(f"✅ Web server started on port {WEB_SERVER_PORT}")
+        logger.info("✅ Web server started on port %s", WEB_SERVER_PORT)
     except Exception as e:
-        logger.error(f"❌ Failed to start web server: {e}")
+        logger.error("❌ Failed to start web server: %s", e)
 
 
 # ==================== LOAD COGS ====================
@@ -454,13 +459,16 @@ async def load_cogs():
     for cog in cogs:
         try:
             await bot.load_extension(cog)
-            logger.info(f"✅ Loaded {cog}")
+            logger.info("✅ Loaded %s", cog)
         except Exception as e:
-            logger.error(f"❌ Failed to load {cog}: {e}")
+            logger.error("❌ Failed to load %s: %s", cog, e)
 
 
 # ==================== MAIN ENTRY POINT ====================
 
+START_MAX_ATTEMPTS = 5  # connection attempts when Discord rate-limits the login
+
+
 async def main():
     """Main entry point"""
     async with bot:
@@ -472,7 +480,19 @@ async def main():
             logger.error("❌ DISCORD_TOKEN not found in environment variables!")
             return
         
-        await bot.start(DISCORD_TOKEN)
+        # Back off on rate limits (honouring Retry-After) instead of hammering the login/IDENTIFY limits
+        for attempt in range(START_MAX_ATTEMPTS):
+            try:
+                await bot.start(DISCORD_TOKEN)
+                break
+            except discord.HTTPException as e:
+                if e.status != 429 or attempt == START_MAX_ATTEMPTS - 1:
+                    raise
+                retry_after = float(e.response.headers.get("Retry-After", 60))
+                delay = max(retry_after, 2 ** attempt) + random.uniform(0, 1)
+                logger.warning("⚠️ Rate limited while connecting, retrying in %.1fs (attempt %s/%s)",
+                               delay, attempt + 1, START_MAX_ATTEMPTS)
+                await asyncio.sleep(delay)
 
 
 if __name__ == "__main__":
@@ -481,4 +501,4 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         logger.info("👋 Bot stopped by user")
     except Exception as e:
-        logger.error(f"❌ Fatal error: {e}")
+        logger.error("❌ Fatal error: %s", e)
@@ -1,22 +1,55 @@
 import psycopg2
 import os
+from contextlib import closing
+from itertools import groupby
 from dotenv import load_dotenv
 
 load_dotenv()
 
-conn = psycopg2.connect(os.getenv('DATABASE_URL'))
-cursor = conn.cursor()
+# Tables whose columns are printed
+TABLES = ["players", "player_weapons", "war_participants", "user_language", "join_requests"]
 
-# Get join_requests table columns
-cursor.execute("""
-    SELECT column_name 
-    FROM information_schema.columns 
-    WHERE table_name = 'join_requests' 
-    ORDER BY ordinal_position
-""")
+# Indexes the per-guild queries rely on (created by Database.create_tables_with_cursor)
+EXPECTED_INDEXES = {
+    "idx_players_guild_id": "players (guild_id, user_id)",
+    "idx_players_guild_mastery": "players (guild_id, mastery_points DESC)",
+    "idx_players_guild_level": "players (guild_id, level DESC, mastery_points DESC)",
+    "idx_player_weapons_guild_id": "player_weapons (guild_id)",
+    "idx_war_participants_guild_id": "war_participants (guild_id)",
+    "idx_user_language_guild_id": "user_language (guild_id)",
+    "idx_join_requests_guild_id": "join_requests (guild_id)",
+    "idx_join_requests_pending": "join_requests (guild_id, requested_at DESC) WHERE status = 'pending'",
+}
 
-print("join_requests table columns:")
-for row in cursor.fetchall():
-    print(f"  - {row[0]}")
 
-conn.close()
+def main():
+    """Print the checked tables' columns and report any missing guild_id index."""
+    # psycopg2's own `with conn` only ends the transaction, so closing() releases the connection
+    with closing(psycopg2.connect(os.getenv('DATABASE_URL'))) as conn, conn.cursor() as cursor:
+        # Get the columns of every table in one query
+        cursor.execute("""
+            SELECT table_name, column_name
+            FROM information_schema.columns
+            WHERE table_name = ANY(%s)
+            ORDER BY table_name, ordinal_position
+        """, (TABLES,))
+
+        for table, rows in groupby(cursor.fetchall(), key=lambda row: row[0]):
+            print(f"{table} table columns:")
+            for _, column in rows:
+                print(f"  - {column}")
+
+        # Check the guild_id indexes
+        cursor.execute("SELECT indexname FROM pg_indexes WHERE indexname = ANY(%s)", (list(EXPECTED_INDEXES),))
+        present = {row[0] for row in cursor.fetchall()}
+
+        print("\nguild_id indexes:")
+        for name, definition in EXPECTED_INDEXES.items():
+            if name in present:
+                print(f"  ✅ {name}")
+            else:
+                print(f"  ❌ {name} missing — CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition};")
+
+
+if __name__ == "__main__":
+    main()
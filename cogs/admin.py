@@ -3,11 +3,38 @@ Admin commands cog for Discord bot.
 Handles help, language settings, and command syncing.
 """
 
+import asyncio
 import discord
 from discord.ext import commands
 from discord import app_commands
-from utils.helpers import get_text
-from locales import LANGUAGES
+from utils.helpers import get_text, get_text_bundle, invalidate_guild_lang_cache
+from locales import LANGUAGES, LANGUAGE_NAMES
+
+# /help sections in display order; each key has a matching "<key>_desc" translation
+_HELP_SECTIONS = ("build_commands", "war_commands", "profile_commands", "system_commands")
+
+# Concurrent member edits in /clearalldata (Discord allows ~5 role edits per guild at a time)
+ROLE_EDIT_CONCURRENCY = 5
+
+
+class ConfirmView(discord.ui.View):
+    """Yes/Cancel confirmation for /clearalldata; value is None on timeout"""
+
+    def __init__(self):
+        super().__init__(timeout=30)
+        self.value = None
+
+    @discord.ui.button(label="✅ Yes, Delete Everything", style=discord.ButtonStyle.danger)
+    async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.value = True
+        self.stop()
+        await interaction.response.defer()
+
+    @discord.ui.button(label="❌ Cancel", style=discord.ButtonStyle.secondary)
+    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.value = False
+        self.stop()
+        await interaction.response.defer()
 
 
 class AdminCog(commands.Cog):
@@ -20,38 +47,16 @@ class AdminCog(commands.Cog):
     @app_commands.command(name="help", description="Show all available commands")
     async def help_command(self, interaction: discord.Interaction):
         """Display help message in your language"""
-        guild_id = interaction.guild_id
-        user_id = interaction.user.id
+        t = get_text_bundle(self.db, interaction.guild_id, interaction.user.id)
         
         embed = discord.Embed(
-            title=get_text(self.db, LANGUAGES, guild_id, "help_title", user_id),
-            description=get_text(self.db, LANGUAGES, guild_id, "help_desc", user_id),
+            title=t["help_title"],
+            description=t["help_desc"],
             color=discord.Color.blue()
         )
         
-        embed.add_field(
-            name=get_text(self.db, LANGUAGES, guild_id, "build_commands", user_id),
-            value=get_text(self.db, LANGUAGES, guild_id, "build_commands_desc", user_id),
-            inline=False
-        )
-        
-        embed.add_field(
-            name=get_text(self.db, LANGUAGES, guild_id, "war_commands", user_id),
-            value=get_text(self.db, LANGUAGES, guild_id, "war_commands_desc", user_id),
-            inline=False
-        )
-        
-        embed.add_field(
-            name=get_text(self.db, LANGUAGES, guild_id, "profile_commands", user_id),
-            value=get_text(self.db, LANGUAGES, guild_id, "profile_commands_desc", user_id),
-            inline=False
-        )
-        
-        embed.add_field(
-            name=get_text(self.db, LANGUAGES, guild_id, "system_commands", user_id),
-            value=get_text(self.db, LANGUAGES, guild_id, "system_commands_desc", user_id),
-            inline=False
-        )
+        for name_key in _HELP_SECTIONS:
+            embed.add_field(name=t[name_key], value=t[f"{name_key}_desc"], inline=False)
         
         await interaction.response.send_message(embed=embed)
     
@@ -61,8 +66,7 @@ class AdminCog(commands.Cog):
     )
     @app_commands.describe(language="Language to set (en or ar)")
     @app_commands.choices(language=[
-        app_commands.Choice(name="English", value="en"),
-        app_commands.Choice(name="العربية (Arabic)", value="ar")
+        app_commands.Choice(name=name, value=code) for code, name in LANGUAGE_NAMES.items()
     ])
     @app_commands.checks.has_permissions(administrator=True)
     async def setlanguage(self, interaction: discord.Interaction, language: app_commands.Choice[str]):
@@ -72,6 +76,7 @@ class AdminCog(commands.Cog):
         lang_code = language.value
         
         self.db.update_server_setting(guild_id, 'language', lang_code)
+        invalidate_guild_lang_cache(guild_id)
         
         await interaction.response.send_message(
             get_text(self.db, LANGUAGES, guild_id, "language_set", user_id).format(language=language.name),
@@ -106,24 +111,6 @@ class AdminCog(commands.Cog):
         """Clear all player data from the database for this server"""
         guild_id = interaction.guild_id
         
-        # Confirmation view
-        class ConfirmView(discord.ui.View):
-            def __init__(self):
-                super().__init__(timeout=30)
-                self.value = None
-            
-            @discord.ui.button(label="✅ Yes, Delete Everything", style=discord.ButtonStyle.danger)
-            async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
-                self.value = True
-                self.stop()
-                await interaction.response.defer()
-            
-            @discord.ui.button(label="❌ Cancel", style=discord.ButtonStyle.secondary)
-            async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
-                self.value = False
-                self.stop()
-                await interaction.response.defer()
-        
         view = ConfirmView()
         await interaction.response.send_message(
             "⚠️ **WARNING: This will permanently delete ALL player data for this server!**\n\n"
@@ -157,49 +144,43 @@ class AdminCog(commands.Cog):
             members_affected = 0
             
             # Get all players to know who to remove roles from
-            players = []
-            with self.db.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT user_id FROM players WHERE guild_id = %s", (guild_id,))
-                players = [row[0] for row in cursor.fetchall()]
+            players = await self.db.async_run(self.db.get_player_ids, guild_id)
             
-            # Remove roles from each player
-            from utils.helpers import remove_all_build_roles
-            for user_id in players:
-                member = guild.get_member(user_id)
-                if member:
-                    success, count = await remove_all_build_roles(member, guild)
-                    if success and count > 0:
-                        removed_roles_count += count
-                        members_affected += 1
+            # Remove roles from each player still in the server; the build/weapon role
+            # names are resolved once and the member edits run a few at a time
+            from utils.helpers import get_build_role_names, remove_all_build_roles
+            role_names = await self.db.async_run(get_build_role_names, self.db)
+            members = [m for m in map(guild.get_member, players) if m]
+            semaphore = asyncio.Semaphore(ROLE_EDIT_CONCURRENCY)
+
+            async def strip_roles(member):
+                async with semaphore:
+                    return await remove_all_build_roles(member, guild, role_names=role_names,
+                                                        reason="Server data cleared")
+
+            for success, count in await asyncio.gather(*map(strip_roles, members)):
+                if success and count > 0:
+                    removed_roles_count += count
+                    members_affected += 1
             
-            # Now delete database records
-            with self.db.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Delete all related data
-                cursor.execute("DELETE FROM player_weapons WHERE guild_id = %s", (guild_id,))
-                weapons_count = cursor.rowcount
-                
-                cursor.execute("DELETE FROM war_participants WHERE guild_id = %s", (guild_id,))
-                war_count = cursor.rowcount
-                
-                cursor.execute("DELETE FROM user_language WHERE guild_id = %s", (guild_id,))
-                lang_count = cursor.rowcount
-                
-                cursor.execute("DELETE FROM join_requests WHERE guild_id = %s", (guild_id,))
-                join_count = cursor.rowcount
-                
-                cursor.execute("DELETE FROM players WHERE guild_id = %s", (guild_id,))
-                player_count = cursor.rowcount
+            # Now delete database records (one round trip for all tables)
+            counts = await self.db.async_run(self.db.clear_guild_data, guild_id)
+            if counts is None:
+                await interaction.followup.send("❌ Error deleting data. Please try again later.", ephemeral=True)
+                return
+
+            # Cached ranks and language preferences would otherwise outlive the wipe
+            from cogs.profile import invalidate_rank_cache
+            invalidate_rank_cache(guild_id)
+            invalidate_guild_lang_cache(guild_id)
             
             await interaction.followup.send(
                 f"✅ **All data deleted successfully!**\n\n"
-                f"• Players: {player_count}\n"
-                f"• Weapons: {weapons_count}\n"
-                f"• War records: {war_count}\n"
-                f"• Language prefs: {lang_count}\n"
-                f"• Join requests: {join_count}\n"
+                f"• Players: {counts['players']}\n"
+                f"• Weapons: {counts['weapons']}\n"
+                f"• War records: {counts['war']}\n"
+                f"• Language prefs: {counts['language']}\n"
+                f"• Join requests: {counts['join_requests']}\n"
                 f"• Roles removed: {removed_roles_count} (from {members_affected} members)",
                 ephemeral=True
             )
@@ -209,6 +190,4 @@ class AdminCog(commands.Cog):
 
 async def setup(bot):
     """Setup function to add cog to bot"""
-    from database import Database
-    db = Database("data/bot_data.db")
-    await bot.add_cog(AdminCog(bot, db))
+    await bot.add_cog(AdminCog(bot, bot.db))
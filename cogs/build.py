@@ -4,18 +4,64 @@ Handles build selection, viewing builds, and role creation.
 All build/weapon data is read live from the database.
 """
 
+import asyncio
 import discord
 from discord.ext import commands
 from discord import app_commands
-from config import get_builds_config, get_weapon_icon
-from utils.helpers import get_text
-from locales import LANGUAGES
+from config import get_build_icon, get_builds_config, get_weapon_lines, invalidate_builds_cache
+from utils.helpers import get_text_bundle, resolve_language
+from locales import LANGUAGES, LANGUAGE_BUNDLES
 from views.build_views import BuildSelectView
 from views.profile_views import ProfileSetupButton
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Concurrent role creations in /createroles (Discord allows ~5 role edits per guild at a time)
+ROLE_CREATE_CONCURRENCY = 5
+
+# /postbuilds embed per language → (builds catalog it was rendered from, embed).
+# A catalog reload hands out a new builds dict, which makes the entry stale.
+_postbuilds_embeds: dict = {}
+
+
+def _get_postbuilds_embed(db, lang: str) -> discord.Embed:
+    """Return the /postbuilds embed for a language, rendering it only when the catalog changed."""
+    builds = get_builds_config(db)
+    cached = _postbuilds_embeds.get(lang)
+    if cached is not None and cached[0] is builds:
+        return cached[1].copy()
+
+    t = LANGUAGE_BUNDLES.get(lang) or LANGUAGE_BUNDLES["en"]
+    weapon_lines = get_weapon_lines(db)
+    embed = discord.Embed(
+        title=t["postbuilds_title"],
+        description=(
+            f"{t['postbuilds_desc']}\n\n"
+            f"{t['postbuilds_includes']}\n"
+            f"• {t['postbuilds_ign']}\n"
+            f"• {t['postbuilds_level_mp']}\n"
+            f"• {t['postbuilds_build_weapons']}\n\n"
+            f"{t['postbuilds_available']}\n"
+            + "\n".join(
+                f"{b['emoji']} **{n}** - {b.get('description', '')}"
+                for n, b in builds.items()
+            )
+        ),
+        color=discord.Color.gold()
+    )
+
+    for build_name, build_data in builds.items():
+        embed.add_field(
+            name=f"{build_data['emoji']} {build_name} {t['weapons']}",
+            value="\n".join(weapon_lines.get(w) or f"⚔️ {w}" for w in build_data.get("weapons", ())) or "—",
+            inline=False
+        )
+
+    embed.set_footer(text=t["postbuilds_footer"])
+    _postbuilds_embeds[lang] = (builds, embed)
+    return embed.copy()
+
 
 class BuildCog(commands.Cog):
     """Build-related commands for managing player builds and weapons"""
@@ -36,42 +82,14 @@ class BuildCog(commands.Cog):
 
         guild_id = interaction.guild_id
         uid = interaction.user.id
-        builds = get_builds_config(self.db)
-
-        embed = discord.Embed(
-            title=get_text(self.db, LANGUAGES, guild_id, "postbuilds_title", uid),
-            description=(
-                f"{get_text(self.db, LANGUAGES, guild_id, 'postbuilds_desc', uid)}\n\n"
-                f"{get_text(self.db, LANGUAGES, guild_id, 'postbuilds_includes', uid)}\n"
-                f"• {get_text(self.db, LANGUAGES, guild_id, 'postbuilds_ign', uid)}\n"
-                f"• {get_text(self.db, LANGUAGES, guild_id, 'postbuilds_level_mp', uid)}\n"
-                f"• {get_text(self.db, LANGUAGES, guild_id, 'postbuilds_build_weapons', uid)}\n\n"
-                f"{get_text(self.db, LANGUAGES, guild_id, 'postbuilds_available', uid)}\n"
-                + "\n".join(
-                    f"{b['emoji']} **{n}** - {b.get('description', '')}"
-                    for n, b in builds.items()
-                )
-            ),
-            color=discord.Color.gold()
-        )
-
-        for build_name, build_data in builds.items():
-            weapons_rows = self.db.get_weapons(build_name)
-            weapons_with_icons = [
-                f"{get_weapon_icon(self.db, w['name'])} {w['name']}" for w in weapons_rows
-            ]
-            embed.add_field(
-                name=f"{build_data['emoji']} {build_name} {get_text(self.db, LANGUAGES, guild_id, 'weapons', uid)}",
-                value="\n".join(weapons_with_icons) or "—",
-                inline=False
-            )
-
-        embed.set_footer(text=get_text(self.db, LANGUAGES, guild_id, "postbuilds_footer", uid))
+        lang = await self.db.async_run(resolve_language, self.db, guild_id, uid)
+        t = LANGUAGE_BUNDLES.get(lang) or LANGUAGE_BUNDLES["en"]
+        embed = await self.db.async_run(_get_postbuilds_embed, self.db, lang)
         view = ProfileSetupButton(guild_id, self.db, LANGUAGES)
 
         await interaction.channel.send(content="@everyone", embed=embed, view=view)
         await interaction.followup.send(
-            get_text(self.db, LANGUAGES, guild_id, "postbuilds_posted", uid),
+            t["postbuilds_posted"],
             ephemeral=True
         )
 
@@ -82,33 +100,34 @@ class BuildCog(commands.Cog):
         user_id = interaction.user.id
         await interaction.response.defer(ephemeral=True)
 
-        player = self.db.get_player(user_id, guild_id)
+        t = await self.db.async_run(get_text_bundle, self.db, guild_id, user_id)
+        player = await self.db.async_run(self.db.get_player_with_weapons, user_id, guild_id)
         if not player:
-            await interaction.followup.send(
-                get_text(self.db, LANGUAGES, guild_id, "no_profile", user_id), ephemeral=True
-            )
+            await interaction.followup.send(t["no_profile"], ephemeral=True)
             return
 
-        weapons = self.db.get_player_weapons(user_id, guild_id)
+        weapons = player["weapons"]
         build_type = player.get('build_type', 'DPS')
-        builds = get_builds_config(self.db)
-        build_icon = builds.get(build_type, {}).get('emoji', '⚔️')
-        weapons_display = "\n".join([
-            f"{get_weapon_icon(self.db, w)} {w}" for w in weapons
-        ]) if weapons else get_text(self.db, LANGUAGES, guild_id, "no_weapons", user_id)
+        build_icon, weapon_lines = await asyncio.gather(
+            self.db.async_run(get_build_icon, self.db, build_type),
+            self.db.async_run(get_weapon_lines, self.db),
+        )
+        weapons_display = "\n".join(
+            weapon_lines.get(w) or f"⚔️ {w}" for w in weapons
+        ) if weapons else t["no_weapons"]
 
         embed = discord.Embed(
             title=f"{build_icon} Your Build",
-            description=f"**{get_text(self.db, LANGUAGES, guild_id, 'build_type', user_id)}:** {build_type}\n\n**{get_text(self.db, LANGUAGES, guild_id, 'weapons', user_id)}:**\n{weapons_display}",
+            description=f"**{t['build_type']}:** {build_type}\n\n**{t['weapons']}:**\n{weapons_display}",
             color=discord.Color.green()
         )
         if player.get('in_game_name'):
             embed.add_field(
-                name=f"📝 {get_text(self.db, LANGUAGES, guild_id, 'in_game_name', user_id)}",
+                name=f"📝 {t['in_game_name']}",
                 value=(
-                    f"**{get_text(self.db, LANGUAGES, guild_id, 'label_name', user_id)}:** {player['in_game_name']}\n"
-                    f"**{get_text(self.db, LANGUAGES, guild_id, 'level', user_id)}:** {player['level']}\n"
-                    f"**{get_text(self.db, LANGUAGES, guild_id, 'mastery_points', user_id)}:** {player['mastery_points']:,}"
+                    f"**{t['label_name']}:** {player['in_game_name']}\n"
+                    f"**{t['level']}:** {player['level']}\n"
+                    f"**{t['mastery_points']}:** {player['mastery_points']:,}"
                 ),
                 inline=False
             )
@@ -132,11 +151,10 @@ class BuildCog(commands.Cog):
         await remove_all_build_roles(member, guild, self.db)
         self.db.set_player_weapons(user_id, guild_id, [])
 
+        t = await self.db.async_run(get_text_bundle, self.db, guild_id, user_id)
         build_view = BuildSelectView(self.db, LANGUAGES)
         await interaction.followup.send(
-            get_text(self.db, LANGUAGES, guild_id, "build_reset", user_id)
-            + "\n\n"
-            + get_text(self.db, LANGUAGES, guild_id, "now_select_build", user_id),
+            t["build_reset"] + "\n\n" + t["now_select_build"],
             view=build_view,
             ephemeral=True
         )
@@ -147,32 +165,41 @@ class BuildCog(commands.Cog):
         """Create all build and weapon roles from database"""
         await interaction.response.defer(ephemeral=True)
         guild = interaction.guild
-        created_roles = []
+        # Snapshot role names once instead of scanning guild.roles for every candidate
+        existing = {r.name for r in guild.roles}
 
-        builds = get_builds_config(self.db)
+        # Each build/weapon gets its first role-name variant that doesn't exist yet
+        to_create = []
+        builds = await self.db.async_run(get_builds_config, self.db)
         for build_name, build_data in builds.items():
             emoji = build_data.get("emoji", "")
-            for role_name in [build_name, f"{emoji} {build_name}".strip()]:
-                if not discord.utils.get(guild.roles, name=role_name):
-                    try:
-                        await guild.create_role(name=role_name, color=discord.Color.orange(), mentionable=True)
-                        created_roles.append(role_name)
-                        break  # only create one variant
-                    except Exception as e:
-                        logger.error(f"Failed to create role {role_name}: {e}")
+            to_create.append(([build_name, f"{emoji} {build_name}".strip()], discord.Color.orange()))
 
-        all_weapons = self.db.get_all_weapons()
+        all_weapons = await self.db.async_run(self.db.get_all_weapons)
         for w in all_weapons:
             w_name = w["name"]
             w_emoji = w.get("emoji", "")
-            for role_name in [w_name, f"{w_emoji} {w_name}".strip()]:
-                if not discord.utils.get(guild.roles, name=role_name):
+            to_create.append(([w_name, f"{w_emoji} {w_name}".strip()], discord.Color.blue()))
+
+        # Create concurrently, capped to stay inside Discord's per-guild rate limit
+        semaphore = asyncio.Semaphore(ROLE_CREATE_CONCURRENCY)
+
+        async def create(candidates, color):
+            async with semaphore:
+                for role_name in candidates:
+                    if role_name in existing:
+                        continue
+                    existing.add(role_name)  # claim the name before awaiting
                     try:
-                        await guild.create_role(name=role_name, color=discord.Color.blue(), mentionable=True)
-                        created_roles.append(role_name)
-                        break
+                        await guild.create_role(name=role_name, color=color, mentionable=True)
+                        return role_name  # only create one variant
                     except Exception as e:
-                        logger.error(f"Failed to create role {role_name}: {e}")
+                        existing.discard(role_name)
+                        logger.error("Failed to create role %s: %s", role_name, e)
+            return None
+
+        results = await asyncio.gather(*(create(c, color) for c, color in to_create))
+        created_roles = [name for name in results if name]
 
         result = (
             f"✅ Created **{len(created_roles)}** roles:\n" + "\n".join(f"• {r}" for r in created_roles)
@@ -217,6 +244,7 @@ class BuildCog(commands.Cog):
         """Add a new build type"""
         await interaction.response.defer(ephemeral=True)
         success = self.db.add_build(name.strip(), emoji.strip(), description.strip())
+        invalidate_builds_cache()
         if success:
             await interaction.followup.send(
                 f"✅ Build **{emoji} {name}** added to the database.\n"
@@ -236,6 +264,7 @@ class BuildCog(commands.Cog):
         """Remove a build type (also removes its weapons via CASCADE)"""
         await interaction.response.defer(ephemeral=True)
         success = self.db.remove_build(name.strip())
+        invalidate_builds_cache()
         if success:
             await interaction.followup.send(
                 f"✅ Build **{name}** and all its weapons have been removed from the database.", ephemeral=True
@@ -264,6 +293,7 @@ class BuildCog(commands.Cog):
             )
             return
         success = self.db.add_weapon(name.strip(), emoji.strip(), build.strip())
+        invalidate_builds_cache()
         if success:
             await interaction.followup.send(
                 f"✅ Weapon **{emoji} {name}** added to **{build}**.\n"
@@ -283,6 +313,7 @@ class BuildCog(commands.Cog):
         """Remove a weapon"""
         await interaction.response.defer(ephemeral=True)
         success = self.db.remove_weapon(name.strip())
+        invalidate_builds_cache()
         if success:
             await interaction.followup.send(
                 f"✅ Weapon **{name}** removed from the database.", ephemeral=True
@@ -295,6 +326,4 @@ class BuildCog(commands.Cog):
 
 async def setup(bot):
     """Setup function to add cog to bot"""
-    from database import Database
-    db = Database("data/bot_data.db")
-    await bot.add_cog(BuildCog(bot, db))
+    await bot.add_cog(BuildCog(bot, bot.db))
@@ -6,7 +6,6 @@ Handles setup of join channels, power requirements, and viewing requests.
 import discord
 from discord import app_commands
 from discord.ext import commands
-from database import Database
 from locales import LANGUAGES
 from utils.helpers import get_text
 from views.join_views import JoinRequestButton
@@ -14,13 +13,42 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Static bilingual welcome embed, built once at import and copied per /setupjoin
+_WELCOME_EMBED_TEMPLATE = discord.Embed(
+    title="🎮 Welcome to Our Guild!",
+    description="Click the button below to request to join our guild.",
+    color=discord.Color.blue()
+)
+_WELCOME_EMBED_TEMPLATE.add_field(
+    name="Requirements:",
+    value=(
+        "• Meet minimum power requirement\n"
+        "• Provide accurate information\n"
+        "• Be active and respectful"
+    ),
+    inline=False
+)
+_WELCOME_EMBED_TEMPLATE.add_field(
+    name="---",
+    value=(
+        "مرحباً بك في نقابتنا!\n\n"
+        "اضغط على الزر أدناه لطلب الانضمام إلى نقابتنا.\n\n"
+        "**المتطلبات:**\n"
+        "• تحقيق الحد الأدنى من القوة المطلوبة\n"
+        "• تقديم معلومات دقيقة\n"
+        "• كن نشطاً ومحترماً"
+    ),
+    inline=False
+)
+_WELCOME_EMBED_TEMPLATE.set_footer(text="Click the button below to get started!")
+
 
 class JoinCog(commands.Cog):
     """Commands for managing guild join requests"""
     
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, db):
         self.bot = bot
-        self.db = Database("data/bot_data.db")
+        self.db = db
     
     @app_commands.command(name="setupjoin", description="Configure join request system (Admin)")
     @app_commands.describe(
@@ -41,44 +69,16 @@ class JoinCog(commands.Cog):
             guild_id = interaction.guild_id
             
             # Store settings
-            self.db.update_join_settings(
+            await self.db.async_run(
+                self.db.update_join_settings,
                 guild_id,
                 join_channel.id,
                 admin_review_channel.id,
                 build_setup_channel.id if build_setup_channel else join_channel.id  # Default to join channel
             )
             
-            # Create welcome embed
-            embed = discord.Embed(
-                title="🎮 Welcome to Our Guild!",
-                description="Click the button below to request to join our guild.",
-                color=discord.Color.blue()
-            )
-            
-            embed.add_field(
-                name="Requirements:",
-                value=(
-                    "• Meet minimum power requirement\n"
-                    "• Provide accurate information\n"
-                    "• Be active and respectful"
-                ),
-                inline=False
-            )
-            
-            embed.add_field(
-                name="---",
-                value=(
-                    "مرحباً بك في نقابتنا!\n\n"
-                    "اضغط على الزر أدناه لطلب الانضمام إلى نقابتنا.\n\n"
-                    "**المتطلبات:**\n"
-                    "• تحقيق الحد الأدنى من القوة المطلوبة\n"
-                    "• تقديم معلومات دقيقة\n"
-                    "• كن نشطاً ومحترماً"
-                ),
-                inline=False
-            )
-            
-            embed.set_footer(text="Click the button below to get started!")
+            # Welcome embed is fully static; copy the module-level template
+            embed = _WELCOME_EMBED_TEMPLATE.copy()
             
             # Send embed with button to join channel
             # from views.join_views import JoinRequestButton # This import is already at the top
@@ -86,7 +86,7 @@ class JoinCog(commands.Cog):
             welcome_msg = await join_channel.send(embed=embed, view=view)
             
             # Save welcome message ID
-            self.db.set_welcome_message_id(guild_id, welcome_msg.id)
+            await self.db.async_run(self.db.set_welcome_message_id, guild_id, welcome_msg.id)
             
             # Confirm to admin
             build_channel_mention = build_setup_channel.mention if build_setup_channel else join_channel.mention
@@ -100,7 +100,7 @@ class JoinCog(commands.Cog):
             )
             
         except Exception as e:
-            logger.error(f"Error in setupjoin: {e}", exc_info=True)
+            logger.error("Error in setupjoin: %s", e, exc_info=True)
             await interaction.response.send_message(
                 "❌ An error occurred. Please try again.",
                 ephemeral=True
@@ -121,7 +121,7 @@ class JoinCog(commands.Cog):
                 )
                 return
             
-            success = self.db.set_min_power_requirement(guild_id, power)
+            success = await self.db.async_run(self.db.set_min_power_requirement, guild_id, power)
             
             if success:
                 await interaction.response.send_message(
@@ -135,7 +135,7 @@ class JoinCog(commands.Cog):
                 )
                 
         except Exception as e:
-            logger.error(f"Error in setjoinrequirement: {e}", exc_info=True)
+            logger.error("Error in setjoinrequirement: %s", e, exc_info=True)
             await interaction.response.send_message(
                 "❌ An error occurred. Please try again.",
                 ephemeral=True
@@ -148,7 +148,7 @@ class JoinCog(commands.Cog):
         try:
             guild_id = interaction.guild_id
             
-            requests = self.db.get_pending_join_requests(guild_id)
+            requests, total = await self.db.async_run(self.db.get_pending_join_requests_page, guild_id, 10)
             
             if not requests:
                 await interaction.response.send_message(
@@ -162,9 +162,9 @@ class JoinCog(commands.Cog):
                 color=discord.Color.blue()
             )
             
-            for req in requests[:10]:  # Show max 10
-                user = self.bot.get_user(req["user_id"])
-                user_mention = user.mention if user else f"<@{req['user_id']}>"
+            for req in requests:  # Show max 10
+                # A mention renders the same from the ID alone, so no user lookup is needed
+                user_mention = f"<@{req['user_id']}>"
                 
                 embed.add_field(
                     name=f"{req['in_game_name']} ({req['language'].upper()})",
@@ -177,13 +177,13 @@ class JoinCog(commands.Cog):
                     inline=False
                 )
             
-            if len(requests) > 10:
-                embed.set_footer(text=f"Showing 10 of {len(requests)} requests")
+            if total > 10:
+                embed.set_footer(text=f"Showing 10 of {total} requests")
             
             await interaction.response.send_message(embed=embed, ephemeral=True)
             
         except Exception as e:
-            logger.error(f"Error in joinrequests: {e}", exc_info=True)
+            logger.error("Error in joinrequests: %s", e, exc_info=True)
             await interaction.response.send_message(
                 "❌ An error occurred. Please try again.",
                 ephemeral=True
@@ -191,4 +191,4 @@ class JoinCog(commands.Cog):
 
 
 async def setup(bot: commands.Bot):
-    await bot.add_cog(JoinCog(bot))
+    await bot.add_cog(JoinCog(bot, bot.db))
@@ -3,14 +3,52 @@ Profile commands cog for Discord bot.
 Handles player profile creation, viewing, updating, and management.
 """
 
+import asyncio
+import time
+from bisect import bisect_left
 import discord
 from discord.ext import commands
 from discord import app_commands
-from config import get_builds_config, get_weapon_icon
-from utils.helpers import get_text, update_member_nickname, invalidate_lang_cache
-from locales import LANGUAGES
+from config import get_build_icon, get_builds_config, get_weapon_lines
+from utils.helpers import get_text, get_text_bundle, update_member_nickname, invalidate_lang_cache
+from locales import LANGUAGES, LANGUAGE_NAMES
 from views.profile_views import LanguageSelectView
 
+# ── Rank cache ────────────────────────────────────────────────────────────────
+# Keyed by guild_id → (timestamp, negated mastery points in ascending order)
+# Entries live 60 seconds and are dropped by the paths that change a profile.
+_rank_cache: dict = {}
+_RANK_CACHE_TTL = 60  # seconds
+
+
+def _get_rank_keys(db, guild_id: int) -> list:
+    """Return the guild's negated mastery points (bisect keys for _rank_from_keys), using a 60-second cache."""
+    now = time.monotonic()
+    cached = _rank_cache.get(guild_id)
+    if cached is not None and now - cached[0] < _RANK_CACHE_TTL:
+        return cached[1]
+
+    # get_all_players already orders by mastery_points DESC
+    keys = [-(p['mastery_points'] or 0) for p in db.get_all_players(guild_id)]
+    _rank_cache[guild_id] = (now, keys)
+    return keys
+
+
+def _rank_from_keys(keys: list, mastery_points: int) -> int:
+    """1-based rank for a mastery score: one more than the number of players with more points."""
+    return bisect_left(keys, -(mastery_points or 0)) + 1
+
+
+def invalidate_rank_cache(guild_id: int):
+    """Call after a profile is created, changed or deleted so ranks reflect it immediately."""
+    _rank_cache.pop(guild_id, None)
+
+
+# ── /leaderboard rows ────────────────────────────────────────────────────────
+_MEDALS = {1: "🥇", 2: "🥈", 3: "🥉"}
+_LEADERBOARD_LINE = "{medal} **{name}** - Lvl {level} | {mastery:,} MP".format
+# ─────────────────────────────────────────────────────────────────────────────
+
 
 class ProfileCog(commands.Cog):
     """Profile-related commands for managing player profiles"""
@@ -24,13 +62,14 @@ class ProfileCog(commands.Cog):
         """Start guided profile setup (always shows language choice first)"""
         guild_id = interaction.guild_id
         user_id = interaction.user.id
+        t = await self.db.async_run(get_text_bundle, self.db, guild_id, user_id)
         
         # Check if user already has a COMPLETE profile (with weapons set)
         # This allows users from approved join requests to complete their setup
-        existing_player = self.db.get_player(user_id, guild_id)
+        existing_player = await self.db.async_run(self.db.get_player_with_weapons, user_id, guild_id)
         if existing_player:
             # Check if they have weapons - if they do, profile is complete
-            weapons = self.db.get_player_weapons(user_id, guild_id)
+            weapons = existing_player["weapons"]
             if weapons and len(weapons) > 0:
                 await interaction.response.send_message(
                     "✅ You already have a complete profile! Use `/profile` to view it or `/resetbuild` to change your build.",
@@ -39,9 +78,9 @@ class ProfileCog(commands.Cog):
                 return
             # If they have a profile but no weapons, let them continue (join request users)
         
-        prompt = get_text(self.db, LANGUAGES, guild_id, "choose_language_prompt", user_id)
+        prompt = t["choose_language_prompt"]
         await interaction.response.send_message(
-            f"**{get_text(self.db, LANGUAGES, guild_id, 'choose_language', user_id)}**\n\n{prompt}",
+            f"**{t['choose_language']}**\n\n{prompt}",
             view=LanguageSelectView(guild_id, self.db, LANGUAGES),
             ephemeral=True
         )
@@ -62,26 +101,32 @@ class ProfileCog(commands.Cog):
         """Set or update player profile"""
         guild_id = interaction.guild_id
         user_id = interaction.user.id
+        # Defer first - the profile write, rank count and nickname edit can outlast the 3s window
+        await interaction.response.defer()
+        t = await self.db.async_run(get_text_bundle, self.db, guild_id, user_id)
         
         if level < 1 or level > 100:
-            await interaction.response.send_message(
-                get_text(self.db, LANGUAGES, guild_id, "err_level_range", user_id),
+            await interaction.followup.send(
+                t["err_level_range"],
                 ephemeral=True
             )
             return
         
         if mastery_points < 0:
-            await interaction.response.send_message(
-                get_text(self.db, LANGUAGES, guild_id, "err_mastery_positive", user_id),
+            await interaction.followup.send(
+                t["err_mastery_positive"],
                 ephemeral=True
             )
             return
         
-        player = await self.db.async_run(self.db.get_player, user_id, guild_id)
-        builds = get_builds_config(self.db)
+        player, builds = await asyncio.gather(
+            self.db.async_run(self.db.get_player_with_weapons, user_id, guild_id),
+            self.db.async_run(get_builds_config, self.db),
+        )
         build_type = player.get('build_type', next(iter(builds), 'DPS')) if player else next(iter(builds), 'DPS')
         
-        self.db.create_or_update_player(
+        await self.db.async_run(
+            self.db.create_or_update_player,
             user_id, guild_id,
             in_game_name,
             mastery_points,
@@ -89,46 +134,46 @@ class ProfileCog(commands.Cog):
             build_type
         )
         
-        # Update Discord nickname to match in-game name
-        member = interaction.user
-        nickname_success, nickname_msg = await update_member_nickname(member, in_game_name)
+        # Update Discord nickname to match in-game name while the rank is counted;
+        # the reply goes out first and its footer is patched with the real result
+        nickname_task = asyncio.create_task(update_member_nickname(interaction.user, in_game_name))
         
-        # Calculate rank
-        all_players = self.db.get_all_players(guild_id)
-        sorted_players = sorted(all_players, key=lambda p: p['mastery_points'], reverse=True)
-        rank = next((i+1 for i, p in enumerate(sorted_players) if p['user_id'] == user_id), 0)
+        # Calculate rank (counted in SQL); the cached ranking is only stale if mastery changed
+        if not player or player['mastery_points'] != mastery_points:
+            invalidate_rank_cache(guild_id)
+        rank = await self.db.async_run(self.db.get_player_rank, user_id, guild_id)
         
         embed = discord.Embed(
-            title=get_text(self.db, LANGUAGES, guild_id, "profile_updated", user_id),
+            title=t["profile_updated"],
             description=(
-                f"**{get_text(self.db, LANGUAGES, guild_id, 'in_game_name', user_id)}:** {in_game_name}\n"
-                f"**{get_text(self.db, LANGUAGES, guild_id, 'level', user_id)}:** {level}\n"
-                f"**{get_text(self.db, LANGUAGES, guild_id, 'mastery_points', user_id)}:** {mastery_points:,}\n"
-                f"**{get_text(self.db, LANGUAGES, guild_id, 'rank', user_id)}:** #{rank}"
+                f"**{t['in_game_name']}:** {in_game_name}\n"
+                f"**{t['level']}:** {level}\n"
+                f"**{t['mastery_points']}:** {mastery_points:,}\n"
+                f"**{t['rank']}:** #{rank}"
             ),
             color=discord.Color.green()
         )
         
         if player:
-            weapons = self.db.get_player_weapons(user_id, guild_id)
+            weapons = player["weapons"]
             if weapons:
-                builds = get_builds_config(self.db)
-                weapons_display = "\n".join([
-                    f"{get_weapon_icon(self.db, w)} {w}" for w in weapons
-                ])
-                build_emoji = builds.get(build_type, {}).get('emoji', '⚔️')
+                weapon_lines, build_emoji = await asyncio.gather(
+                    self.db.async_run(get_weapon_lines, self.db),
+                    self.db.async_run(get_build_icon, self.db, build_type),
+                )
+                weapons_display = "\n".join(weapon_lines.get(w) or f"⚔️ {w}" for w in weapons)
                 embed.add_field(
-                    name=f"{build_emoji} {get_text(self.db, LANGUAGES, guild_id, 'build_type', user_id)}",
+                    name=f"{build_emoji} {t['build_type']}",
                     value=f"**{build_type}**\n{weapons_display}",
                     inline=False
                 )
         
-        if nickname_success:
-            embed.set_footer(text=f"✅ {nickname_msg}")
-        else:
-            embed.set_footer(text=nickname_msg)
+        embed.set_footer(text=t["nickname_updating"])
+        await interaction.followup.send(embed=embed)
         
-        await interaction.response.send_message(embed=embed)
+        nickname_success, nickname_msg = await nickname_task
+        embed.set_footer(text=f"✅ {nickname_msg}" if nickname_success else nickname_msg)
+        await interaction.edit_original_response(embed=embed)
     
     @app_commands.command(name="profile", description="View player profile")
     @app_commands.describe(user="The user to view (optional, defaults to yourself)")
@@ -139,70 +184,74 @@ class ProfileCog(commands.Cog):
         target_user = user or interaction.user
         target_id = target_user.id
         await interaction.response.defer()
+        t = await self.db.async_run(get_text_bundle, self.db, guild_id, viewer_id)
         
-        player = await self.db.async_run(self.db.get_player, target_id, guild_id)
+        # The player row and the guild ranking are independent, so load them together
+        player, rank_keys = await asyncio.gather(
+            self.db.async_run(self.db.get_player_with_weapons, target_id, guild_id),
+            self.db.async_run(_get_rank_keys, self.db, guild_id),
+        )
         
         if not player:
             await interaction.followup.send(
-                get_text(self.db, LANGUAGES, guild_id, "no_profile", viewer_id),
+                t["no_profile"],
                 ephemeral=True
             )
             return
         
         # Calculate rank
-        all_players = await self.db.async_run(self.db.get_all_players, guild_id)
-        sorted_players = sorted(all_players, key=lambda p: p['mastery_points'], reverse=True)
-        rank = next((i+1 for i, p in enumerate(sorted_players) if p['user_id'] == target_id), 0)
+        rank = _rank_from_keys(rank_keys, player.get('mastery_points', 0))
         
         build_type = player.get('build_type', 'Not set')
-        builds = get_builds_config(self.db)
-        build_icon = builds.get(build_type, {}).get('emoji', '⚔️')
+        build_icon = await self.db.async_run(get_build_icon, self.db, build_type)
+        
+        # Build and weapons
+        weapons = player["weapons"]
+        if weapons:
+            weapon_lines = await self.db.async_run(get_weapon_lines, self.db)
+            weapons_display = "\n".join(weapon_lines.get(w) or f"⚔️ {w}" for w in weapons)
+        else:
+            weapons_display = t["no_weapons"]
         
         embed = discord.Embed(
-            title=f"{get_text(self.db, LANGUAGES, guild_id, 'profile_title', viewer_id)}",
+            title=t["profile_title"],
             color=discord.Color.blue()
         )
         
         embed.set_author(name=target_user.display_name, icon_url=target_user.display_avatar.url)
         
         embed.add_field(
-            name=f"📝 {get_text(self.db, LANGUAGES, guild_id, 'in_game_name', viewer_id)}",
-            value=player.get('in_game_name', get_text(self.db, LANGUAGES, guild_id, 'not_set', viewer_id)),
+            name=f"📝 {t['in_game_name']}",
+            value=player.get('in_game_name', t['not_set']),
             inline=True
         )
         
         embed.add_field(
-            name=f"⭐ {get_text(self.db, LANGUAGES, guild_id, 'level', viewer_id)}",
+            name=f"⭐ {t['level']}",
             value=str(player.get('level', 1)),
             inline=True
         )
         
         embed.add_field(
-            name=f"⚡ {get_text(self.db, LANGUAGES, guild_id, 'mastery_points', viewer_id)}",
+            name=f"⚡ {t['mastery_points']}",
             value=f"{player.get('mastery_points', 0):,}",
             inline=True
         )
         
         embed.add_field(
-            name=f"🏆 {get_text(self.db, LANGUAGES, guild_id, 'rank', viewer_id)}",
+            name=f"🏆 {t['rank']}",
             value=f"#{rank}",
             inline=True
         )
         
-        # Build and weapons
-        weapons = self.db.get_player_weapons(target_id, guild_id)
-        weapons_display = "\n".join([
-            f"{get_weapon_icon(self.db, w)} {w}" for w in weapons
-        ]) if weapons else get_text(self.db, LANGUAGES, guild_id, "no_weapons", viewer_id)
-        
         embed.add_field(
-            name=f"{build_icon} {get_text(self.db, LANGUAGES, guild_id, 'build_type', viewer_id)}",
+            name=f"{build_icon} {t['build_type']}",
             value=f"**{build_type}**",
             inline=False
         )
         
         embed.add_field(
-            name=f"⚔️ {get_text(self.db, LANGUAGES, guild_id, 'weapons', viewer_id)}",
+            name=f"⚔️ {t['weapons']}",
             value=weapons_display,
             inline=False
         )
@@ -224,52 +273,47 @@ class ProfileCog(commands.Cog):
         guild_id = interaction.guild_id
         user_id = interaction.user.id
         await interaction.response.defer(ephemeral=True)
+        t = await self.db.async_run(get_text_bundle, self.db, guild_id, user_id)
         
-        player = await self.db.async_run(self.db.get_player, user_id, guild_id)
-        
-        if not player:
+        if level is not None and (level < 1 or level > 100):
             await interaction.followup.send(
-                get_text(self.db, LANGUAGES, guild_id, "no_profile", user_id),
+                t["err_level_range"],
                 ephemeral=True
             )
             return
         
-        if level is not None and (level < 1 or level > 100):
+        if mastery_points is not None and mastery_points < 0:
             await interaction.followup.send(
-                get_text(self.db, LANGUAGES, guild_id, "err_level_range", user_id),
+                t["err_mastery_positive"],
                 ephemeral=True
             )
             return
         
-        if mastery_points is not None and mastery_points < 0:
+        # Single UPDATE ... RETURNING: omitted stats keep their stored value
+        player = await self.db.async_run(
+            self.db.update_player_stats, user_id, guild_id, mastery_points, level
+        )
+        
+        if not player:
             await interaction.followup.send(
-                get_text(self.db, LANGUAGES, guild_id, "err_mastery_positive", user_id),
+                t["no_profile"],
                 ephemeral=True
             )
             return
         
-        new_mastery = mastery_points if mastery_points is not None else player['mastery_points']
-        new_level = level if level is not None else player['level']
+        new_mastery = player['mastery_points']
+        new_level = player['level']
         
-        self.db.create_or_update_player(
-            user_id, guild_id,
-            player['in_game_name'],
-            new_mastery,
-            new_level,
-            player['build_type']
-        )
-        
-        # Calculate new rank
-        all_players = await self.db.async_run(self.db.get_all_players, guild_id)
-        sorted_players = sorted(all_players, key=lambda p: p['mastery_points'], reverse=True)
-        rank = next((i+1 for i, p in enumerate(sorted_players) if p['user_id'] == user_id), 0)
+        # Calculate new rank (counted in SQL; the cached ranking is stale after this write)
+        invalidate_rank_cache(guild_id)
+        rank = await self.db.async_run(self.db.get_player_rank, user_id, guild_id)
         
         embed = discord.Embed(
-            title=get_text(self.db, LANGUAGES, guild_id, "stats_updated", user_id),
+            title=t["stats_updated"],
             description=(
-                f"**{get_text(self.db, LANGUAGES, guild_id, 'level', user_id)}:** {new_level}\n"
-                f"**{get_text(self.db, LANGUAGES, guild_id, 'mastery_points', user_id)}:** {new_mastery:,}\n"
-                f"**{get_text(self.db, LANGUAGES, guild_id, 'rank', user_id)}:** #{rank}"
+                f"**{t['level']}:** {new_level}\n"
+                f"**{t['mastery_points']}:** {new_mastery:,}\n"
+                f"**{t['rank']}:** #{rank}"
             ),
             color=discord.Color.green()
         )
@@ -283,46 +327,38 @@ class ProfileCog(commands.Cog):
         guild_id = interaction.guild_id
         user_id = interaction.user.id
         await interaction.response.defer()
+        t = await self.db.async_run(get_text_bundle, self.db, guild_id, user_id)
         
-        player = await self.db.async_run(self.db.get_player, user_id, guild_id)
+        # Only the name changes, so ranks (and the rank cache) are unaffected
+        renamed = await self.db.async_run(self.db.update_player_name, user_id, guild_id, new_name)
         
-        if not player:
+        if not renamed:
             await interaction.followup.send(
-                get_text(self.db, LANGUAGES, guild_id, "no_profile", user_id),
+                t["no_profile"],
                 ephemeral=True
             )
             return
         
-        self.db.create_or_update_player(
-            user_id, guild_id,
-            new_name,
-            player['mastery_points'],
-            player['level'],
-            player['build_type']
-        )
-        
-        # Update Discord nickname
-        member = interaction.user
-        nickname_success, nickname_msg = await update_member_nickname(member, new_name)
+        # Update Discord nickname; the reply goes out first and its footer is patched with the result
+        nickname_task = asyncio.create_task(update_member_nickname(interaction.user, new_name))
         
         embed = discord.Embed(
-            title=get_text(self.db, LANGUAGES, guild_id, "name_changed", user_id),
-            description=f"**{get_text(self.db, LANGUAGES, guild_id, 'in_game_name', user_id)}:** {new_name}",
+            title=t["name_changed"],
+            description=f"**{t['in_game_name']}:** {new_name}",
             color=discord.Color.green()
         )
         
-        if nickname_success:
-            embed.set_footer(text=f"✅ {nickname_msg}")
-        else:
-            embed.set_footer(text=nickname_msg)
-        
+        embed.set_footer(text=t["nickname_updating"])
         await interaction.followup.send(embed=embed)
+        
+        nickname_success, nickname_msg = await nickname_task
+        embed.set_footer(text=f"✅ {nickname_msg}" if nickname_success else nickname_msg)
+        await interaction.edit_original_response(embed=embed)
     
     @app_commands.command(name="mylanguage", description="Set or view your preferred language (English/Arabic)")
     @app_commands.describe(language="Language to set (optional)")
     @app_commands.choices(language=[
-        app_commands.Choice(name="English", value="en"),
-        app_commands.Choice(name="العربية (Arabic)", value="ar")
+        app_commands.Choice(name=name, value=code) for code, name in LANGUAGE_NAMES.items()
     ])
     async def mylanguage(self, interaction: discord.Interaction, language: app_commands.Choice[str] = None):
         """Set or view user's language preference"""
@@ -331,21 +367,23 @@ class ProfileCog(commands.Cog):
         
         if language:
             # Set language
-            self.db.set_user_language(user_id, guild_id, language.value)
+            await self.db.async_run(self.db.set_user_language, user_id, guild_id, language.value)
             # Invalidate cache so new language applies immediately
             invalidate_lang_cache(user_id, guild_id)
+            set_msg = await self.db.async_run(get_text, self.db, LANGUAGES, guild_id, "mylanguage_set", user_id)
             await interaction.response.send_message(
-                get_text(self.db, LANGUAGES, guild_id, "mylanguage_set", user_id).format(lang=language.name),
+                set_msg.format(lang=language.name),
                 ephemeral=True
             )
         else:
             # View current language
-            current_lang = self.db.get_user_language(user_id, guild_id)
-            lang_name = "English" if current_lang == "en" else "العربية (Arabic)"
+            current_lang = await self.db.async_run(self.db.get_user_language, user_id, guild_id)
+            lang_name = LANGUAGE_NAMES.get(current_lang, current_lang)
+            t = await self.db.async_run(get_text_bundle, self.db, guild_id, user_id)
             
             embed = discord.Embed(
-                title=get_text(self.db, LANGUAGES, guild_id, "mylanguage_title", user_id),
-                description=get_text(self.db, LANGUAGES, guild_id, "mylanguage_current", user_id).format(lang=lang_name),
+                title=t["mylanguage_title"],
+                description=t["mylanguage_current"].format(lang=lang_name),
                 color=discord.Color.blue()
             )
             
@@ -362,12 +400,13 @@ class ProfileCog(commands.Cog):
         
         # Defer immediately - role removal is a slow Discord API call
         await interaction.response.defer(ephemeral=True)
+        t = await self.db.async_run(get_text_bundle, self.db, guild_id, viewer_id)
         
         player = await self.db.async_run(self.db.get_player, target_id, guild_id)
         
         if not player:
             await interaction.followup.send(
-                get_text(self.db, LANGUAGES, guild_id, "deleteprofile_no_profile", viewer_id),
+                t["deleteprofile_no_profile"],
                 ephemeral=True
             )
             return
@@ -382,14 +421,15 @@ class ProfileCog(commands.Cog):
         
         removed_roles_count = 0
         if member:
-            success, removed_roles_count = await remove_all_build_roles(member, guild)
+            success, removed_roles_count = await remove_all_build_roles(member, guild, reason="Profile deleted")
         
         # Delete the player profile
         deleted = await self.db.async_run(self.db.delete_player, target_id, guild_id)
+        invalidate_rank_cache(guild_id)
         
         if deleted:
             await interaction.followup.send(
-                f"✅ {get_text(self.db, LANGUAGES, guild_id, 'profile_deleted', viewer_id).format(name=player_name)}\n\n"
+                f"✅ {t['profile_deleted'].format(name=player_name)}\n\n"
                 f"**Roles removed:** {removed_roles_count}",
                 ephemeral=True
             )
@@ -422,38 +462,34 @@ class ProfileCog(commands.Cog):
         sort_by = type.value if type else "mastery"
         limit = max(1, min(limit, 25))  # Clamp between 1 and 25
         
-        all_players = await self.db.async_run(self.db.get_all_players, guild_id)
+        top_players = await self.db.async_run(self.db.top_players, guild_id, sort_by, limit)
         
-        if not all_players:
+        if not top_players:
             await interaction.followup.send(
-                get_text(self.db, LANGUAGES, guild_id, "no_players_leaderboard", user_id),
+                await self.db.async_run(get_text, self.db, LANGUAGES, guild_id, "no_players_leaderboard", user_id),
                 ephemeral=True
             )
             return
         
-        # Sort players
         if sort_by == "level":
-            sorted_players = sorted(all_players, key=lambda p: (p['level'], p['mastery_points']), reverse=True)
             title = f"🏆 Leaderboard - Top {limit} by Level"
         else:
-            sorted_players = sorted(all_players, key=lambda p: p['mastery_points'], reverse=True)
             title = f"🏆 Leaderboard - Top {limit} by Mastery"
         
         # Build leaderboard
-        leaderboard_text = []
-        for i, player in enumerate(sorted_players[:limit], 1):
-            medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"{i}."
-            name = player.get('in_game_name', 'Unknown')
-            level = player.get('level', 1)
-            mastery = player.get('mastery_points', 0)
-            
-            leaderboard_text.append(
-                f"{medal} **{name}** - Lvl {level} | {mastery:,} MP"
+        leaderboard_text = "\n".join(
+            _LEADERBOARD_LINE(
+                medal=_MEDALS.get(i) or f"{i}.",
+                name=player.get('in_game_name', 'Unknown'),
+                level=player.get('level', 1),
+                mastery=player.get('mastery_points', 0),
             )
+            for i, player in enumerate(top_players, 1)
+        )
         
         embed = discord.Embed(
             title=title,
-            description="\n".join(leaderboard_text),
+            description=leaderboard_text,
             color=discord.Color.gold()
         )
         
@@ -462,6 +498,4 @@ class ProfileCog(commands.Cog):
 
 async def setup(bot):
     """Setup function to add cog to bot"""
-    from database import Database
-    db = Database("data/bot_data.db")
-    await bot.add_cog(ProfileCog(bot, db))
+    await bot.add_cog(ProfileCog(bot, bot.db))
@@ -5,17 +5,21 @@ All war events are stored in the database — fully flexible, any day/time.
 """
 
 import asyncio
+import re
+from collections import namedtuple
 import discord
 from discord.ext import commands
 from discord import app_commands
-import pytz
-from datetime import datetime, timedelta
-from config import get_builds_config, get_weapon_icon
-from utils.helpers import get_text, get_discord_timestamp
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfoNotFoundError
+from config import get_builds_config, get_weapon_icons
+from utils.helpers import get_text, get_text_bundle, get_discord_timestamp, get_timezone, join_mentions
 from utils.war_helpers import (
     get_current_poll_week,
     get_war_config,
     update_war_setting,
+    update_war_settings,
+    days_until,
     DAY_MAP,
 )
 from locales import LANGUAGES
@@ -31,25 +35,124 @@ DAYS_OF_WEEK = [
 ]
 
 
-def _days_until(target_weekday: int, from_weekday: int) -> int:
-    """Return the number of days from 'from_weekday' until the next 'target_weekday' (0 = today)."""
-    delta = (target_weekday - from_weekday) % 7
-    return delta
+# A channel mention (<#123>) or a bare channel ID
+_CHANNEL_RE = re.compile(r"<#(\d+)>|(\d+)")
 
 
-def _event_timestamp(event: dict, guild_timezone: str) -> str:
-    """Return a Discord relative timestamp for the next occurrence of a war event."""
+def _parse_int(value: str) -> int | None:
+    """Parse a non-negative integer option value without raising; returns None if invalid."""
+    value = value.strip()
+    return int(value) if value.isdecimal() else None
+
+
+def _guild_today(guild_timezone: str) -> date:
+    """Today's date in the guild's timezone (zone objects are cached by get_timezone)."""
+    return datetime.now(get_timezone(guild_timezone)).date()
+
+
+def _event_timestamp(event: dict, guild_timezone: str, today: date = None) -> str:
+    """
+    Return a Discord relative timestamp for the next occurrence of a war event.
+    Pass `today` (see _guild_today) when formatting several events so the clock is read once.
+    """
     day_name = event["day_of_week"]
     target_wd = DAY_MAP.get(day_name, 5)
-    now = datetime.now(pytz.timezone(guild_timezone))
-    days_ahead = _days_until(target_wd, now.weekday())
-    return get_discord_timestamp(event["war_hour"], event["war_minute"], days_ahead, guild_timezone)
+    # The timestamp itself is memoized per day
+    if today is None:
+        today = _guild_today(guild_timezone)
+    days_ahead = days_until(target_wd, today.weekday())
+    return get_discord_timestamp(event["war_hour"], event["war_minute"], days_ahead, guild_timezone, today)
+
+
+# One chunk of a /warlist build column, ready for embed.add_field
+_EmbedField = namedtuple("_EmbedField", ["name", "value", "inline"])
+
+# Discord rejects an embed with more than 25 fields or 6000 characters in total
+EMBED_MAX_FIELDS = 25
+EMBED_MAX_CHARS = 6000
+
+
+def _add_field_paged(embeds: list, name: str, value: str, inline: bool, reserve: int = 0):
+    """
+    Add a field to the last embed in `embeds`, first starting a continuation embed if the
+    field would push it past Discord's limits. `reserve` keeps room for a footer set later.
+    """
+    embed = embeds[-1]
+    if (len(embed.fields) >= EMBED_MAX_FIELDS
+            or len(embed) + len(name) + len(value) + reserve > EMBED_MAX_CHARS):
+        embed = discord.Embed(color=embed.color)
+        embeds.append(embed)
+    embed.add_field(name=name, value=value, inline=inline)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # Poll Views
 # ══════════════════════════════════════════════════════════════════════════════
 
+async def _safe_defer(interaction: discord.Interaction, ephemeral: bool = True) -> bool:
+    """Defer an interaction, retrying twice on a 429; returns False if it could not be acknowledged."""
+    for attempt in range(3):
+        try:
+            await interaction.response.defer(ephemeral=ephemeral)
+            return True
+        except discord.HTTPException as e:
+            if e.status == 429 and attempt < 2:
+                await asyncio.sleep(float(getattr(e, "retry_after", 5)))
+            else:
+                return False
+    return False
+
+
+async def _handle_vote(db, interaction: discord.Interaction, event_name: str, playing: bool):
+    """Shared Playing / Not Playing handler for every war poll button."""
+    if not await _safe_defer(interaction):
+        return
+
+    guild_id = interaction.guild_id
+    user_id = interaction.user.id
+
+    # Profile check, previous vote and upsert run as a single statement
+    result = await db.async_run(
+        db.record_war_vote, guild_id, user_id, event_name, get_current_poll_week(), playing
+    )
+
+    if result is None:
+        await interaction.followup.send("❌ An error occurred. Please try again.", ephemeral=True)
+        return
+
+    has_profile, prev = result
+    if not has_profile:
+        await interaction.followup.send(
+            get_text(db, LANGUAGES, guild_id, "err_no_profile_war", user_id),
+            ephemeral=True
+        )
+        return
+
+    event_label = f"**{event_name}**"
+    if playing:
+        if prev is True:
+            msg = f"ℹ️ You're already registered as **Playing** for {event_label}."
+        else:
+            msg = f"✅ Registered as **Playing** for {event_label}!"
+    else:
+        if prev is False:
+            msg = f"ℹ️ You're already registered as **Not Playing** for {event_label}."
+        else:
+            msg = f"❌ Registered as **Not Playing** for {event_label}."
+            if prev is True:
+                msg += "\n*(Changed from Playing)*"
+
+    for attempt in range(3):
+        try:
+            await interaction.followup.send(msg, ephemeral=True)
+            break
+        except discord.HTTPException as e:
+            if e.status == 429 and attempt < 2:
+                await asyncio.sleep(float(getattr(e, "retry_after", 5)))
+            else:
+                break
+
+
 class WarPollSingleView(discord.ui.View):
     """Two-button poll for a single war event: ✅ Playing / ❌ Not Playing."""
 
@@ -76,66 +179,10 @@ class WarPollSingleView(discord.ui.View):
         self.add_item(not_playing_btn)
 
     async def _playing_callback(self, interaction: discord.Interaction):
-        await self._handle(interaction, playing=True)
+        await _handle_vote(self.db, interaction, self.event_name, playing=True)
 
     async def _not_playing_callback(self, interaction: discord.Interaction):
-        await self._handle(interaction, playing=False)
-
-    async def _handle(self, interaction: discord.Interaction, playing: bool):
-        for attempt in range(3):
-            try:
-                await interaction.response.defer(ephemeral=True)
-                break
-            except discord.HTTPException as e:
-                if e.status == 429 and attempt < 2:
-                    await asyncio.sleep(float(getattr(e, "retry_after", 5)))
-                else:
-                    return
-
-        guild_id = interaction.guild_id
-        user_id = interaction.user.id
-
-        def db_work():
-            player = self.db.get_player(user_id, guild_id)
-            if not player:
-                return None, None
-            poll_week = get_current_poll_week()
-            prev = self.db.get_user_war_vote(guild_id, user_id, self.event_name, poll_week)
-            self.db.set_war_vote(guild_id, user_id, self.event_name, poll_week, playing)
-            return player, prev
-
-        player, prev = await self.db.async_run(db_work)
-
-        if player is None:
-            await interaction.followup.send(
-                get_text(self.db, LANGUAGES, guild_id, "err_no_profile_war", user_id),
-                ephemeral=True
-            )
-            return
-
-        event_label = f"**{self.event_name}**"
-        if playing:
-            if prev is True:
-                msg = f"ℹ️ You're already registered as **Playing** for {event_label}."
-            else:
-                msg = f"✅ Registered as **Playing** for {event_label}!"
-        else:
-            if prev is False:
-                msg = f"ℹ️ You're already registered as **Not Playing** for {event_label}."
-            else:
-                msg = f"❌ Registered as **Not Playing** for {event_label}."
-                if prev is True:
-                    msg += f"\n*(Changed from Playing)*"
-
-        for attempt in range(3):
-            try:
-                await interaction.followup.send(msg, ephemeral=True)
-                break
-            except discord.HTTPException as e:
-                if e.status == 429 and attempt < 2:
-                    await asyncio.sleep(float(getattr(e, "retry_after", 5)))
-                else:
-                    break
+        await _handle_vote(self.db, interaction, self.event_name, playing=False)
 
 
 class WarPollAllView(discord.ui.View):
@@ -169,54 +216,7 @@ class WarPollAllView(discord.ui.View):
 
     def _make_callback(self, event_name: str, playing: bool):
         async def callback(interaction: discord.Interaction):
-            for attempt in range(3):
-                try:
-                    await interaction.response.defer(ephemeral=True)
-                    break
-                except discord.HTTPException as e:
-                    if e.status == 429 and attempt < 2:
-                        await asyncio.sleep(float(getattr(e, "retry_after", 5)))
-                    else:
-                        return
-
-            guild_id = interaction.guild_id
-            user_id = interaction.user.id
-
-            def db_work():
-                player = self.db.get_player(user_id, guild_id)
-                if not player:
-                    return None, None
-                poll_week = get_current_poll_week()
-                prev = self.db.get_user_war_vote(guild_id, user_id, event_name, poll_week)
-                self.db.set_war_vote(guild_id, user_id, event_name, poll_week, playing)
-                return player, prev
-
-            player, prev = await self.db.async_run(db_work)
-
-            if player is None:
-                await interaction.followup.send(
-                    get_text(self.db, LANGUAGES, guild_id, "err_no_profile_war", user_id),
-                    ephemeral=True
-                )
-                return
-
-            event_label = f"**{event_name}**"
-            if playing:
-                msg = f"✅ Registered as **Playing** for {event_label}!" if prev is not True else f"ℹ️ Already registered as **Playing** for {event_label}."
-            else:
-                msg = f"❌ Registered as **Not Playing** for {event_label}."
-                if prev is True:
-                    msg += " *(Changed from Playing)*"
-
-            for attempt in range(3):
-                try:
-                    await interaction.followup.send(msg, ephemeral=True)
-                    break
-                except discord.HTTPException as e:
-                    if e.status == 429 and attempt < 2:
-                        await asyncio.sleep(float(getattr(e, "retry_after", 5)))
-                    else:
-                        break
+            await _handle_vote(self.db, interaction, event_name, playing)
 
         return callback
 
@@ -225,6 +225,51 @@ class WarPollAllView(discord.ui.View):
 WarPollView = WarPollAllView
 
 
+def build_war_poll_embed(db, guild_id: int, events: list, guild_tz: str, user_id: int = None) -> discord.Embed:
+    """Build the all-events poll embed (shared by /warpoll and the scheduled auto-post)."""
+    t = get_text_bundle(db, guild_id, user_id)
+    embed = discord.Embed(
+        title=t["war_poll_title"],
+        description=t["war_poll_desc"],
+        color=discord.Color.red()
+    )
+    today = _guild_today(guild_tz)
+    for ev in events:
+        ts = _event_timestamp(ev, guild_tz, today)
+        embed.add_field(
+            name=f"⚔️ {ev['name']}",
+            value=f"📅 {ev['day_of_week']}  ⏰ {ts}",
+            inline=False
+        )
+    embed.add_field(
+        name="ℹ️",
+        value=t["use_warlist"],
+        inline=False
+    )
+    embed.set_footer(text=t["times_local"])
+    return embed
+
+
+async def send_war_poll(channel: discord.TextChannel, db, guild_id: int, events: list,
+                        guild_tz: str, user_id: int = None):
+    """Post the all-events poll, falling back to one poll per event when there are too many buttons."""
+    embed = build_war_poll_embed(db, guild_id, events, guild_tz, user_id)
+
+    if len(events) <= 12:  # 2 buttons per event × 12 = 24 (Discord max 25)
+        view = WarPollAllView(guild_id, db, events)
+        await channel.send(embed=embed, view=view)
+    else:
+        await channel.send(embed=embed)
+        # Post individual polls for each event
+        for ev in events:
+            ev_embed = discord.Embed(
+                title=f"⚔️ {ev['name']} — {ev['day_of_week']}",
+                color=discord.Color.red()
+            )
+            ev_view = WarPollSingleView(guild_id, db, ev["name"])
+            await channel.send(embed=ev_embed, view=ev_view)
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 # Cog
 # ══════════════════════════════════════════════════════════════════════════════
@@ -247,7 +292,8 @@ class WarCog(commands.Cog):
         """Post war poll for a specific event or all active events"""
         guild_id = interaction.guild_id
         uid = interaction.user.id
-        await interaction.response.defer(ephemeral=True)
+        if not await _safe_defer(interaction):
+            return
 
         config = await self.db.async_run(get_war_config, self.db, guild_id)
         channel_id = config.get("war_channel_id")
@@ -267,7 +313,7 @@ class WarCog(commands.Cog):
             return
 
         guild_tz = config.get("timezone", "Africa/Cairo")
-        active_events = self.db.get_war_events(guild_id, active_only=True)
+        active_events = await self.db.async_run(self.db.get_war_events, guild_id, active_only=True)
 
         if not active_events:
             await interaction.followup.send(
@@ -301,38 +347,7 @@ class WarCog(commands.Cog):
 
         else:
             # All-events poll
-            embed = discord.Embed(
-                title=get_text(self.db, LANGUAGES, guild_id, "war_poll_title", uid),
-                description=get_text(self.db, LANGUAGES, guild_id, "war_poll_desc", uid),
-                color=discord.Color.red()
-            )
-            for ev in active_events:
-                ts = _event_timestamp(ev, guild_tz)
-                embed.add_field(
-                    name=f"⚔️ {ev['name']}",
-                    value=f"📅 {ev['day_of_week']}  ⏰ {ts}",
-                    inline=False
-                )
-            embed.add_field(
-                name="ℹ️",
-                value=get_text(self.db, LANGUAGES, guild_id, "use_warlist", uid),
-                inline=False
-            )
-            embed.set_footer(text=get_text(self.db, LANGUAGES, guild_id, "times_local", uid))
-
-            if len(active_events) <= 12:  # 2 buttons per event × 12 = 24 (Discord max 25)
-                view = WarPollAllView(guild_id, self.db, active_events)
-                await channel.send(embed=embed, view=view)
-            else:
-                await channel.send(embed=embed)
-                # Post individual polls for each event
-                for ev in active_events:
-                    ev_embed = discord.Embed(
-                        title=f"⚔️ {ev['name']} — {ev['day_of_week']}",
-                        color=discord.Color.red()
-                    )
-                    ev_view = WarPollSingleView(guild_id, self.db, ev["name"])
-                    await channel.send(embed=ev_embed, view=ev_view)
+            await send_war_poll(channel, self.db, guild_id, active_events, guild_tz, uid)
 
         await interaction.followup.send("✅ War poll posted!", ephemeral=True)
 
@@ -342,18 +357,22 @@ class WarCog(commands.Cog):
     @app_commands.describe(event="Filter by event name (optional)")
     async def warlist(self, interaction: discord.Interaction, event: str = None):
         """Show war participants with build info per event"""
-        from collections import namedtuple
-        _EmbedField = namedtuple("_EmbedField", ["name", "value", "inline"])
-
         guild_id = interaction.guild_id
         user_id = interaction.user.id
-        await interaction.response.defer()
-
+        if not await _safe_defer(interaction, ephemeral=False):
+            return
         poll_week = get_current_poll_week()
-        config = get_war_config(self.db, guild_id)
+        # Every lookup below can hit the DB, so they run in worker threads, side by side
+        t, config, all_events, playing_by_event, builds_config, weapon_icons = await asyncio.gather(
+            self.db.async_run(get_text_bundle, self.db, guild_id, user_id),
+            self.db.async_run(get_war_config, self.db, guild_id),
+            self.db.async_run(self.db.get_war_events, guild_id, active_only=False),
+            self.db.async_run(self.db.get_playing_ids_by_event, guild_id, poll_week),
+            self.db.async_run(get_builds_config, self.db),
+            self.db.async_run(get_weapon_icons, self.db),
+        )
         guild_tz = config.get("timezone", "Africa/Cairo")
 
-        all_events = self.db.get_war_events(guild_id, active_only=False)
         if event:
             all_events = [e for e in all_events if e["name"].lower() == event.lower()]
 
@@ -361,82 +380,101 @@ class WarCog(commands.Cog):
             await interaction.followup.send("⚠️ No war events found.", ephemeral=True)
             return
 
-        builds_config = get_builds_config(self.db)
         build_names = list(builds_config.keys())
+        # (build, icon) pairs in display order, resolved once per command; "Unknown"
+        # only gets fields, not a summary entry
+        build_order = [(bn, bd.get("emoji", "❓")) for bn, bd in builds_config.items()]
+        field_order = build_order + [("Unknown", "❓")]
         FIELD_LIMIT = 1024
+        NAME_LIMIT = 200  # in-game names are free text; icons are added after the cut
 
-        def format_build_fields(build_type_name, players_list):
+        def format_build_fields(build_type_name, icon, players_list):
             if not players_list:
                 return []
-            icon = builds_config.get(build_type_name, {}).get("emoji", "❓")
             base = f"{icon} {build_type_name} ({len(players_list)})"
-            chunk, chunk_len, part, out = [], 0, 1, []
-            for entry in players_list:
-                line = f"• {entry}"
-                if chunk_len + len(line) + 1 > FIELD_LIMIT and chunk:
-                    out.append(_EmbedField(
-                        name=base if part == 1 else f"{icon} {build_type_name} (cont. {part})",
-                        value="\n".join(chunk), inline=True
-                    ))
-                    part += 1; chunk = [line]; chunk_len = len(line) + 1
-                else:
-                    chunk.append(line); chunk_len += len(line) + 1
-            if chunk:
+            # Names are already clamped in player_entry; this hard stop keeps every line
+            # (plus its newline) within one field, so the packer below always makes progress
+            lines = [
+                line if len(line) < FIELD_LIMIT else line[:FIELD_LIMIT - 2] + "…"
+                for line in (f"• {entry}" for entry in players_list)
+            ]
+            lens = [len(line) + 1 for line in lines]  # +1 for the joining newline
+            out, i, n = [], 0, len(lines)
+            # Greedy packing: take as many whole lines as fit in each field
+            while i < n:
+                j, size = i, 0
+                while j < n and size + lens[j] <= FIELD_LIMIT:
+                    size += lens[j]
+                    j += 1
+                part = len(out) + 1
                 out.append(_EmbedField(
                     name=base if part == 1 else f"{icon} {build_type_name} (cont. {part})",
-                    value="\n".join(chunk), inline=True
+                    value="\n".join(lines[i:j]), inline=True
                 ))
+                i = j
             return out
 
-        embed = discord.Embed(
-            title=get_text(self.db, LANGUAGES, guild_id, "war_list_title", user_id),
+        # Large rosters overflow one embed, so fields go through _add_field_paged
+        embeds = [discord.Embed(
+            title=t["war_list_title"],
             color=discord.Color.orange()
-        )
+        )]
+        footer = t["footer_builds"]
+
+        # One query (above) for every event's sign-ups and one for every signed-up
+        # player's profile and weapons; players in several events appear once
+        all_ids = {pid for ev in all_events for pid in playing_by_event.get(ev["name"], [])}
+        players = await self.db.async_run(self.db.get_players_with_weapons, all_ids, guild_id)
+        player_entries = {}
+
+        def player_entry(pid):
+            if pid not in player_entries:
+                player = players.get(pid)
+                if player:
+                    name_str = str(player.get("in_game_name", f"<@{pid}>"))[:NAME_LIMIT]
+                    icons = "".join(weapon_icons.get(w, "⚔️") for w in player["weapons"][:2])
+                    # Cut the name, not the rendered line, so emoji tokens stay whole
+                    entry = f"{name_str} {icons}".strip()
+                    player_entries[pid] = (player.get("build_type", "Unknown"), entry)
+                else:
+                    player_entries[pid] = ("Unknown", f"<@{pid}>")
+            return player_entries[pid]
 
+        today = _guild_today(guild_tz)
         for ev in all_events:
-            votes = self.db.get_war_votes(guild_id, ev["name"], poll_week)
-            playing_ids = [v["user_id"] for v in votes if v["playing"]]
+            playing_ids = playing_by_event.get(ev["name"], [])
             total = len(playing_ids)
 
             # Build breakdown
             build_data = {bn: [] for bn in build_names}
             build_data["Unknown"] = []
             for pid in playing_ids:
-                player = self.db.get_player(pid, guild_id)
-                weapons = self.db.get_player_weapons(pid, guild_id) or []
-                if player:
-                    name_str = player.get("in_game_name", f"<@{pid}>")
-                    build = player.get("build_type", "Unknown")
-                    icons = "".join(get_weapon_icon(self.db, w) for w in weapons[:2])
-                    entry = f"{name_str} {icons}".strip()
-                else:
-                    build = "Unknown"
-                    entry = f"<@{pid}>"
+                build, entry = player_entry(pid)
                 (build_data.get(build) or build_data["Unknown"]).append(entry)
 
-            ts = _event_timestamp(ev, guild_tz)
+            ts = _event_timestamp(ev, guild_tz, today)
             status_icon = "✅" if ev["active"] else "⏸️"
             summary = " • ".join(
-                f"{builds_config.get(bt, {}).get('emoji', '❓')} **{len(build_data[bt])} {bt}**"
-                for bt in build_names if build_data.get(bt)
+                f"{icon} **{len(build_data[bt])} {bt}**"
+                for bt, icon in build_order if build_data[bt]
             )
-            embed.add_field(
-                name=f"{status_icon} {ev['name']} — {ev['day_of_week']} {ts}",
-                value=f"**Playing: {total}**" + (f"\n{summary}" if summary else ""),
-                inline=False
+            _add_field_paged(
+                embeds,
+                f"{status_icon} {ev['name']} — {ev['day_of_week']} {ts}",
+                f"**Playing: {total}**" + (f"\n{summary}" if summary else ""),
+                False, len(footer)
             )
             if total:
-                for bt in build_names + ["Unknown"]:
-                    for f in format_build_fields(bt, build_data.get(bt, [])):
-                        embed.add_field(name=f.name, value=f.value, inline=f.inline)
+                for bt, icon in field_order:
+                    for f in format_build_fields(bt, icon, build_data[bt]):
+                        _add_field_paged(embeds, f.name, f.value, f.inline, len(footer))
             else:
-                embed.add_field(
-                    name=get_text(self.db, LANGUAGES, guild_id, "no_players", user_id),
-                    value="\u200b", inline=False
-                )
+                _add_field_paged(embeds, t["no_players"], "\u200b", False, len(footer))
 
-        embed.set_footer(text=get_text(self.db, LANGUAGES, guild_id, "footer_builds", user_id))
-        await interaction.followup.send(embed=embed)
+        embeds[-1].set_footer(text=footer)
+        # The 6000-character cap covers every embed in a message, so send one per message
+        for embed in embeds:
+            await interaction.followup.send(embed=embed)
 
     # ── War Event Management ──────────────────────────────────────────────────
 
@@ -445,7 +483,8 @@ class WarCog(commands.Cog):
     async def listwars(self, interaction: discord.Interaction):
         """Show all war events for this server"""
         guild_id = interaction.guild_id
-        await interaction.response.defer(ephemeral=True)
+        if not await _safe_defer(interaction):
+            return
         config = get_war_config(self.db, guild_id)
         guild_tz = config.get("timezone", "Africa/Cairo")
 
@@ -461,9 +500,10 @@ class WarCog(commands.Cog):
             description=f"Timezone: **{guild_tz}**",
             color=discord.Color.orange()
         )
+        today = _guild_today(guild_tz)
         for ev in events:
             status = "✅ Active" if ev["active"] else "⏸️ Paused"
-            ts = _event_timestamp(ev, guild_tz)
+            ts = _event_timestamp(ev, guild_tz, today)
             embed.add_field(
                 name=f"{'✅' if ev['active'] else '⏸️'} {ev['name']}",
                 value=(
@@ -492,7 +532,8 @@ class WarCog(commands.Cog):
                      hour: int, minute: int):
         """Add a new war event"""
         guild_id = interaction.guild_id
-        await interaction.response.defer(ephemeral=True)
+        if not await _safe_defer(interaction):
+            return
 
         if not (0 <= hour <= 23):
             await interaction.followup.send("❌ Hour must be 0–23.", ephemeral=True)
@@ -524,7 +565,8 @@ class WarCog(commands.Cog):
     async def removewar(self, interaction: discord.Interaction, name: str):
         """Remove a war event"""
         guild_id = interaction.guild_id
-        await interaction.response.defer(ephemeral=True)
+        if not await _safe_defer(interaction):
+            return
         success = self.db.remove_war_event(guild_id, name.strip())
         if success:
             await interaction.followup.send(f"✅ War event **{name}** removed.", ephemeral=True)
@@ -537,7 +579,8 @@ class WarCog(commands.Cog):
     async def togglewar(self, interaction: discord.Interaction, name: str):
         """Toggle active/paused state of a war event"""
         guild_id = interaction.guild_id
-        await interaction.response.defer(ephemeral=True)
+        if not await _safe_defer(interaction):
+            return
         new_state = self.db.toggle_war_event(guild_id, name.strip())
         if new_state is None:
             await interaction.followup.send(f"❌ Event **{name}** not found.", ephemeral=True)
@@ -564,45 +607,41 @@ class WarCog(commands.Cog):
         user_id = interaction.user.id
         key = setting.value
 
+        # Each branch yields either an error message or the value to store and show
+        error = None
         if key == "war_channel_id":
-            if value.startswith("<#") and value.endswith(">"):
-                channel_id = int(value[2:-1])
+            match = _CHANNEL_RE.fullmatch(value.strip())
+            channel_id = int(match.group(1) or match.group(2)) if match else None
+            if channel_id is None:
+                error = "❌ Invalid channel ID"
+            elif not interaction.guild.get_channel(channel_id):
+                error = "❌ Channel not found"
             else:
-                try:
-                    channel_id = int(value)
-                except ValueError:
-                    await interaction.response.send_message("❌ Invalid channel ID", ephemeral=True)
-                    return
-            channel = interaction.guild.get_channel(channel_id)
-            if not channel:
-                await interaction.response.send_message("❌ Channel not found", ephemeral=True)
-                return
-            update_war_setting(self.db, guild_id, key, channel_id)
-            display_value = f"<#{channel_id}>"
+                db_value, display_value = channel_id, f"<#{channel_id}>"
 
         elif key == "reminder_hours_before":
-            try:
-                hours = int(value)
-                if not (0 <= hours <= 48):
-                    await interaction.response.send_message("❌ Hours must be 0–48", ephemeral=True)
-                    return
-                update_war_setting(self.db, guild_id, key, hours)
-                display_value = f"{hours} hours"
-            except ValueError:
-                await interaction.response.send_message("❌ Invalid number", ephemeral=True)
-                return
+            hours = _parse_int(value)
+            if hours is None:
+                error = "❌ Invalid number"
+            elif not (0 <= hours <= 48):
+                error = "❌ Hours must be 0–48"
+            else:
+                db_value, display_value = hours, f"{hours} hours"
 
         elif key == "timezone":
             try:
-                pytz.timezone(value)
-                update_war_setting(self.db, guild_id, key, value)
-                display_value = value
-            except pytz.exceptions.UnknownTimeZoneError:
-                await interaction.response.send_message("❌ Invalid timezone", ephemeral=True)
-                return
+                # Store the canonical spelling (e.g. "africa/cairo" → "Africa/Cairo")
+                db_value = display_value = get_timezone(value).key
+            except (ZoneInfoNotFoundError, ValueError):
+                error = "❌ Invalid timezone"
         else:
-            update_war_setting(self.db, guild_id, key, value)
-            display_value = value
+            db_value = display_value = value
+
+        if error is None and not await self.db.async_run(update_war_setting, self.db, guild_id, key, db_value):
+            error = "❌ Failed to save the setting. Please try again."
+        if error is not None:
+            await interaction.response.send_message(error, ephemeral=True)
+            return
 
         await interaction.response.send_message(
             get_text(self.db, LANGUAGES, guild_id, "setting_updated", user_id).format(
@@ -617,7 +656,8 @@ class WarCog(commands.Cog):
     async def warconfig(self, interaction: discord.Interaction):
         """View war configuration and all events"""
         guild_id = interaction.guild_id
-        await interaction.response.defer(ephemeral=True)
+        if not await _safe_defer(interaction):
+            return
         config = get_war_config(self.db, guild_id)
         guild_tz = config.get("timezone", "Africa/Cairo")
 
@@ -652,15 +692,15 @@ class WarCog(commands.Cog):
     async def warschedule(self, interaction: discord.Interaction):
         """Show a full overview of all war-related schedule settings"""
         guild_id = interaction.guild_id
-        await interaction.response.defer(ephemeral=True)
+        if not await _safe_defer(interaction):
+            return
         config = await self.db.async_run(get_war_config, self.db, guild_id)
         tz = config.get("timezone", "Africa/Cairo")
 
         channel_id = config.get("war_channel_id")
         channel_str = f"<#{channel_id}>" if channel_id else "❌ Not set — use `/setwar War Channel`"
         poll_day = config.get("poll_day", "Friday")
-        poll_h  = config["poll_time"]["hour"]
-        poll_m  = config["poll_time"]["minute"]
+        poll_time = config["poll_time_str"]
         reminder = config.get("reminder_hours", 2)
 
         embed = discord.Embed(
@@ -669,14 +709,15 @@ class WarCog(commands.Cog):
             color=discord.Color.blurple()
         )
         embed.add_field(name="📢 War Channel", value=channel_str, inline=False)
-        embed.add_field(name="🗳️ Poll Posted", value=f"Every **{poll_day}** at **{poll_h:02d}:{poll_m:02d}**", inline=False)
+        embed.add_field(name="🗳️ Poll Posted", value=f"Every **{poll_day}** at **{poll_time}**", inline=False)
         embed.add_field(name="🔔 Reminder", value=f"**{reminder}h** before each war", inline=False)
 
         events = self.db.get_war_events(guild_id)
         if events:
             embed.add_field(name="\u200b", value="**⚔️ War Events**", inline=False)
+            today = _guild_today(tz)
             for ev in events:
-                ts = _event_timestamp(ev, tz)
+                ts = _event_timestamp(ev, tz, today)
                 status = "✅" if ev["active"] else "⏸️"
                 embed.add_field(
                     name=f"{status} {ev['name']}",
@@ -703,19 +744,19 @@ class WarCog(commands.Cog):
         """Set or view the automatic war poll schedule"""
         guild_id = interaction.guild_id
         uid = interaction.user.id
-        await interaction.response.defer(ephemeral=True)
+        if not await _safe_defer(interaction):
+            return
 
         if day is None and hour is None and minute is None:
             config = await self.db.async_run(get_war_config, self.db, guild_id)
             current_day  = config.get("poll_day", "Friday")
-            current_hour = config["poll_time"]["hour"]
-            current_min  = config["poll_time"]["minute"]
+            current_time = config["poll_time_str"]
             tz = config.get("timezone", "Africa/Cairo")
             embed = discord.Embed(
                 title="📅 War Poll Schedule",
                 description=(
                     f"**Day:** {current_day}\n"
-                    f"**Time:** {current_hour:02d}:{current_min:02d} ({tz})\n\n"
+                    f"**Time:** {current_time} ({tz})\n\n"
                     f"Use `/setpollschedule day hour minute` to change."
                 ),
                 color=discord.Color.blue()
@@ -730,21 +771,25 @@ class WarCog(commands.Cog):
             await interaction.followup.send("❌ Minute must be 0–59.", ephemeral=True)
             return
 
-        changes = []
+        changes, settings = [], {}
         if day is not None:
-            await self.db.async_run(update_war_setting, self.db, guild_id, "poll_day", day.value)
+            settings["poll_day"] = day.value
             changes.append(f"**Day:** {day.value}")
         if hour is not None:
-            await self.db.async_run(update_war_setting, self.db, guild_id, "poll_time_hour", hour)
+            settings["poll_time_hour"] = hour
             changes.append(f"**Hour:** {hour:02d}")
         if minute is not None:
-            await self.db.async_run(update_war_setting, self.db, guild_id, "poll_time_minute", minute)
+            settings["poll_time_minute"] = minute
             changes.append(f"**Minute:** {minute:02d}")
+        # All changed columns live on one server_settings row, so write them together;
+        # the upsert returns the row, so the new schedule needs no second read
+        config = await self.db.async_run(update_war_settings, self.db, guild_id, settings)
+        if config is None:
+            await interaction.followup.send("❌ Failed to update the poll schedule.", ephemeral=True)
+            return
 
-        config = await self.db.async_run(get_war_config, self.db, guild_id)
         new_day  = config.get("poll_day", "Friday")
-        new_h    = config["poll_time"]["hour"]
-        new_m    = config["poll_time"]["minute"]
+        new_time = config["poll_time_str"]
         tz       = config.get("timezone", "Africa/Cairo")
 
         embed = discord.Embed(
@@ -754,7 +799,7 @@ class WarCog(commands.Cog):
         )
         embed.add_field(
             name="📋 New Schedule",
-            value=f"Every **{new_day}** at **{new_h:02d}:{new_m:02d}** ({tz})",
+            value=f"Every **{new_day}** at **{new_time}** ({tz})",
             inline=False
         )
         await interaction.followup.send(embed=embed, ephemeral=True)
@@ -768,7 +813,8 @@ class WarCog(commands.Cog):
         """Test war reminder"""
         guild_id = interaction.guild_id
         user_id = interaction.user.id
-        await interaction.response.defer(ephemeral=True)
+        if not await _safe_defer(interaction):
+            return
 
         config = get_war_config(self.db, guild_id)
         channel_id = config.get("war_channel_id")
@@ -801,10 +847,10 @@ class WarCog(commands.Cog):
             ev = events[0]
 
         poll_week = get_current_poll_week()
-        votes = self.db.get_war_votes(guild_id, ev["name"], poll_week)
-        playing_ids = [v["user_id"] for v in votes if v["playing"]]
+        votes = self.db.get_war_votes(guild_id, ev["name"], poll_week, playing_only=True)
+        playing_ids = [v["user_id"] for v in votes]
 
-        mentions = " ".join(f"<@{uid}>" for uid in playing_ids) if playing_ids else "@everyone (test)"
+        mentions = join_mentions(playing_ids, limit=1900) if playing_ids else "@everyone (test)"
 
         embed = discord.Embed(
             title=f"⚔️ {ev['name']} War Reminder (TEST)",
@@ -860,6 +906,4 @@ class WarCog(commands.Cog):
 
 async def setup(bot):
     """Setup function to add cog to bot"""
-    from database import Database
-    db = Database("data/bot_data.db")
-    await bot.add_cog(WarCog(bot, db))
+    await bot.add_cog(WarCog(bot, bot.db))
@@ -4,6 +4,9 @@ Contains build types, weapon icons, and other static configuration.
 These dicts are the SEED defaults — at runtime the bot reads from the database.
 """
 
+import time
+from types import MappingProxyType
+
 # Build System Icons (seed defaults)
 BUILD_ICONS = {
     "DPS": "<:emoji_1:1472992992791887964>",
@@ -52,12 +55,59 @@ BUILDS = {
     }
 }
 
+# Shared read-only default for lookups of builds that don't exist,
+# so `builds.get(name, EMPTY_BUILD)` never allocates a throwaway dict
+EMPTY_BUILD = MappingProxyType({})
+
 
 # ── Runtime helpers (DB-first, fallback to hardcoded seed) ────────────────────
 
+# Process-wide cache of the build/weapon catalogue: (builds, weapon_icons, loaded_at).
+# Admin commands that change builds or weapons call invalidate_builds_cache().
+_catalog_cache = None
+_CATALOG_CACHE_TTL = 300  # seconds
+
+
+def _load_catalog(db) -> tuple[dict, dict]:
+    """Read builds and weapons with two queries total and cache the result."""
+    global _catalog_cache
+    now = time.monotonic()
+    if _catalog_cache is not None and now - _catalog_cache[2] < _CATALOG_CACHE_TTL:
+        return _catalog_cache[0], _catalog_cache[1]
+
+    builds_rows = db.get_builds()
+    if not builds_rows:
+        # Nothing seeded yet (or DB unavailable) — don't cache the fallback
+        return BUILDS, WEAPON_ICONS
+
+    weapons_by_build = {}
+    icons = dict(WEAPON_ICONS)
+    for w in db.get_all_weapons():
+        weapons_by_build.setdefault(w["build_name"], []).append(w["name"])
+        if w.get("emoji"):
+            icons[w["name"]] = w["emoji"]
+
+    builds = {
+        b["name"]: {
+            "emoji": b["emoji"],
+            "description": b.get("description", ""),
+            "weapons": weapons_by_build.get(b["name"], []),
+        }
+        for b in builds_rows
+    }
+    _catalog_cache = (builds, icons, now)
+    return builds, icons
+
+
+def invalidate_builds_cache():
+    """Drop the cached catalogue so the next read sees admin changes immediately."""
+    global _catalog_cache
+    _catalog_cache = None
+
+
 def get_builds_config(db) -> dict:
     """
-    Return a BUILDS-shaped dict read live from the database.
+    Return a BUILDS-shaped dict read from the database (cached, see _load_catalog).
     Falls back to the hardcoded BUILDS dict if the DB tables are empty or unavailable.
 
     Shape:
@@ -67,29 +117,45 @@ def get_builds_config(db) -> dict:
         }
     """
     try:
-        builds_rows = db.get_builds()
-        if not builds_rows:
-            return BUILDS
-        result = {}
-        for b in builds_rows:
-            name = b["name"]
-            weapons_rows = db.get_weapons(name)
-            result[name] = {
-                "emoji": b["emoji"],
-                "description": b.get("description", ""),
-                "weapons": [w["name"] for w in weapons_rows],
-            }
-        return result
+        return _load_catalog(db)[0]
     except Exception:
         return BUILDS
 
 
+def get_build_icon(db, build_type: str) -> str:
+    """Return the emoji for a build from the cached catalogue, "⚔️" if unknown."""
+    return get_builds_config(db).get(build_type, EMPTY_BUILD).get("emoji", "⚔️")
+
+
 def get_weapon_icon(db, weapon_name: str) -> str:
     """Return the emoji for a weapon. DB-first, then hardcoded fallback."""
+    return get_weapon_icons(db).get(weapon_name, "⚔️")
+
+
+def get_weapon_icons(db) -> dict:
+    """
+    Return a {weapon_name: emoji} map for every weapon (cached, see _load_catalog).
+    DB rows override the hardcoded WEAPON_ICONS seed; use this instead of
+    calling get_weapon_icon() in a loop.
+    """
     try:
-        row = db.get_weapon_by_name(weapon_name)
-        if row:
-            return row["emoji"]
+        return _load_catalog(db)[1]
     except Exception:
-        pass
-    return WEAPON_ICONS.get(weapon_name, "⚔️")
+        return WEAPON_ICONS
+
+
+# Icon map the weapon lines were last built from → {weapon_name: "emoji name"}
+_weapon_lines_cache: tuple = (None, {})
+
+
+def get_weapon_lines(db) -> dict:
+    """
+    Return a {weapon_name: "emoji name"} map of preformatted display lines,
+    rebuilt only when the cached catalogue (see get_weapon_icons) changes.
+    Weapons missing from the map should fall back to f"⚔️ {name}".
+    """
+    global _weapon_lines_cache
+    icons = get_weapon_icons(db)
+    if _weapon_lines_cache[0] is not icons:
+        _weapon_lines_cache = (icons, {w: f"{icon} {w}" for w, icon in icons.items()})
+    return _weapon_lines_cache[1]
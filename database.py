@@ -3,6 +3,7 @@ import os
 from datetime import datetime
 from typing import Optional, List, Dict, Tuple
 import json
+import threading
 from contextlib import contextmanager
 
 import psycopg2
@@ -12,12 +13,17 @@ from psycopg2.extras import RealDictCursor
 logger = logging.getLogger(__name__)
 
 # Whitelist of allowed server settings to prevent SQL injection
-ALLOWED_SETTINGS = {
+ALLOWED_SETTINGS = frozenset({
     'language', 'war_channel_id', 'poll_day', 'poll_time_hour', 'poll_time_minute',
     'saturday_war_hour', 'saturday_war_minute', 'sunday_war_hour', 'sunday_war_minute',
     'saturday_war_day', 'sunday_war_day',
     'reminder_hours_before', 'timezone'
-}
+})
+
+POOL_MIN_CONN = 1
+POOL_MAX_CONN = 10
+# How long a worker thread waits for a free connection before giving up
+POOL_WAIT_SECONDS = 30
 
 
 class Database:
@@ -39,48 +45,55 @@ class Database:
     def _init_postgres_pool(self):
         """Initialize PostgreSQL connection pool"""
         try:
-            self.connection_pool = psycopg2.pool.SimpleConnectionPool(
-                1,  # minconn
-                10,  # maxconn
+            # Threaded pool: async_run hands queries to worker threads, which
+            # SimpleConnectionPool is not safe to be shared between
+            self.connection_pool = psycopg2.pool.ThreadedConnectionPool(
+                POOL_MIN_CONN,
+                POOL_MAX_CONN,
                 self.database_url
             )
+            # getconn() raises PoolError as soon as the pool is exhausted, so
+            # gathered queries wait here for a free slot instead
+            self._pool_slots = threading.BoundedSemaphore(POOL_MAX_CONN)
             logger.info("✅ PostgreSQL connection pool created")
         except Exception as e:
-            logger.error(f"Error creating PostgreSQL connection pool: {e}")
+            logger.error("Error creating PostgreSQL connection pool: %s", e)
             raise
     
     @contextmanager
     def get_connection(self):
-        """Get a connection from the pool, with automatic reconnection on stale connections."""
-        for attempt in range(2):
-            conn = self.connection_pool.getconn()
-            try:
-                # Test the connection is alive before using it
-                conn.cursor().execute("SELECT 1")
-                break  # Connection is good
-            except Exception:
-                # Connection is dead — close it and recreate the pool
+        """Get a connection from the pool, replacing it if it has gone stale."""
+        if not self._pool_slots.acquire(timeout=POOL_WAIT_SECONDS):
+            raise psycopg2.pool.PoolError("timed out waiting for a database connection")
+        conn = None
+        try:
+            for attempt in range(2):
+                conn = self.connection_pool.getconn()
                 try:
-                    self.connection_pool.putconn(conn, close=True)
+                    # Test the connection is alive before using it
+                    conn.cursor().execute("SELECT 1")
+                    break
                 except Exception:
-                    pass
-                if attempt == 0:
-                    logger.warning("Dead DB connection detected, recreating pool...")
+                    # Close only this connection (other threads keep theirs) and try a fresh one
+                    logger.warning("Dead DB connection detected, replacing it...")
+                    dead, conn = conn, None
                     try:
-                        self.connection_pool.closeall()
+                        self.connection_pool.putconn(dead, close=True)
                     except Exception:
                         pass
-                    self._init_postgres_pool()
-                else:
-                    raise
-        try:
-            yield conn
-            conn.commit()
-        except Exception:
-            conn.rollback()
-            raise
+                    if attempt:
+                        raise
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
         finally:
-            self.connection_pool.putconn(conn)
+            if conn is not None:
+                # A connection that died mid-query is closed rather than handed to the next caller
+                self.connection_pool.putconn(conn, close=bool(conn.closed))
+            self._pool_slots.release()
     
     async def async_run(self, func, *args, **kwargs):
         """Run a synchronous DB method in a thread to avoid blocking the event loop"""
@@ -94,9 +107,9 @@ class Database:
                 cursor = conn.cursor()
                 self.create_tables_with_cursor(cursor)
             db_info = self.database_url.split('@')[1] if '@' in self.database_url else 'database'
-            logger.info(f"✅ Database initialized: {db_info}")
+            logger.info("✅ Database initialized: %s", db_info)
         except Exception as e:
-            logger.error(f"Error initializing database: {e}")
+            logger.error("Error initializing database: %s", e)
             raise
     
     def create_tables_with_cursor(self, cursor):
@@ -340,6 +353,25 @@ class Database:
             )
         """)
 
+        # guild_id indexes for the per-guild scans (player lists, /clearalldata).
+        # players is keyed (guild_id, user_id) so listing a guild's user IDs is index-only.
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_players_guild_id ON players (guild_id, user_id)")
+        # Rank lookups count players above a score within a guild
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_players_guild_mastery ON players (guild_id, mastery_points DESC)"
+        )
+        # /leaderboard by level reads the top rows of this index directly
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_players_guild_level ON players (guild_id, level DESC, mastery_points DESC)"
+        )
+        for table in ("player_weapons", "war_participants", "user_language", "join_requests"):
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_guild_id ON {table} (guild_id)")
+        # /joinrequests lists a guild's pending requests newest first; reviewed rows stay out of the index
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_join_requests_pending ON join_requests (guild_id, requested_at DESC) "
+            "WHERE status = 'pending'"
+        )
+
         # Seed war_events from server_settings for guilds that have none
         # We do this lazily per-guild when they first interact (can't know all guilds here)
         # But we can still create the table with no data; seeding happens in get_war_events()
@@ -367,7 +399,41 @@ class Database:
                 """, (user_id, guild_id, in_game_name, mastery_points, level, build_type))
             return True
         except Exception as e:
-            logger.error(f"Error creating/updating player: {e}")
+            logger.error("Error creating/updating player: %s", e)
+            return False
+    
+    def update_player_stats(self, user_id: int, guild_id: int,
+                            mastery_points: int = None, level: int = None) -> Optional[Dict]:
+        """Update mastery/level in place (None keeps the current value); returns the updated row or None if no profile"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                cursor.execute("""
+                    UPDATE players SET
+                        mastery_points = COALESCE(%s, mastery_points),
+                        level = COALESCE(%s, level),
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE user_id = %s AND guild_id = %s
+                    RETURNING *
+                """, (mastery_points, level, user_id, guild_id))
+                row = cursor.fetchone()
+                return dict(row) if row else None
+        except Exception as e:
+            logger.error("Error updating player stats: %s", e)
+            return None
+    
+    def update_player_name(self, user_id: int, guild_id: int, in_game_name: str) -> bool:
+        """Rename an existing player; returns False if they have no profile"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    UPDATE players SET in_game_name = %s, updated_at = CURRENT_TIMESTAMP
+                    WHERE user_id = %s AND guild_id = %s
+                """, (in_game_name, user_id, guild_id))
+                return cursor.rowcount > 0
+        except Exception as e:
+            logger.error("Error updating player name: %s", e)
             return False
     
     def get_player(self, user_id: int, guild_id: int) -> Optional[Dict]:
@@ -381,9 +447,56 @@ class Database:
                 row = cursor.fetchone()
                 return dict(row) if row else None
         except Exception as e:
-            logger.error(f"Error getting player: {e}")
+            logger.error("Error getting player: %s", e)
             return None
     
+    def get_player_with_weapons(self, user_id: int, guild_id: int) -> Optional[Dict]:
+        """Get player profile with a 'weapons' list, in one query"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                cursor.execute("""
+                    SELECT p.*,
+                           COALESCE(
+                               array_agg(w.weapon_name) FILTER (WHERE w.weapon_name IS NOT NULL),
+                               '{}'
+                           ) AS weapons
+                    FROM players p
+                    LEFT JOIN player_weapons w ON w.user_id = p.user_id AND w.guild_id = p.guild_id
+                    WHERE p.user_id = %s AND p.guild_id = %s
+                    GROUP BY p.user_id, p.guild_id
+                """, (user_id, guild_id))
+                row = cursor.fetchone()
+                return dict(row) if row else None
+        except Exception as e:
+            logger.error("Error getting player with weapons: %s", e)
+            return None
+    
+    def get_players_with_weapons(self, user_ids, guild_id: int) -> Dict[int, Dict]:
+        """Get {user_id: player with 'weapons' list} for many players in one query; missing players are omitted"""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                # A Python list binds as one array parameter, so there is no per-ID placeholder limit
+                cursor.execute("""
+                    SELECT p.*,
+                           COALESCE(
+                               array_agg(w.weapon_name) FILTER (WHERE w.weapon_name IS NOT NULL),
+                               '{}'
+                           ) AS weapons
+                    FROM players p
+                    LEFT JOIN player_weapons w ON w.user_id = p.user_id AND w.guild_id = p.guild_id
+                    WHERE p.guild_id = %s AND p.user_id = ANY(%s)
+                    GROUP BY p.user_id, p.guild_id
+                """, (guild_id, user_ids))
+                return {row['user_id']: dict(row) for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error("Error getting players with weapons: %s", e)
+            return {}
+    
     def get_all_players(self, guild_id: int) -> List[Dict]:
         """Get all players in a guild ordered by mastery points"""
         try:
@@ -396,9 +509,51 @@ class Database:
                 """, (guild_id,))
                 return [dict(row) for row in cursor.fetchall()]
         except Exception as e:
-            logger.error(f"Error getting all players: {e}")
+            logger.error("Error getting all players: %s", e)
+            return []
+    
+    # ORDER BY clauses for top_players, matching idx_players_guild_mastery / idx_players_guild_level
+    _TOP_PLAYERS_ORDER = {
+        "mastery": "mastery_points DESC",
+        "level": "level DESC, mastery_points DESC",
+    }
+    
+    def top_players(self, guild_id: int, sort_by: str = "mastery", limit: int = 10) -> List[Dict]:
+        """Get the top `limit` players in a guild by mastery points or level"""
+        order = self._TOP_PLAYERS_ORDER.get(sort_by, self._TOP_PLAYERS_ORDER["mastery"])
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                cursor.execute(f"""
+                    SELECT in_game_name, level, mastery_points FROM players
+                    WHERE guild_id = %s
+                    ORDER BY {order}
+                    LIMIT %s
+                """, (guild_id, limit))
+                return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error("Error getting top players: %s", e)
             return []
     
+    def get_player_rank(self, user_id: int, guild_id: int) -> int:
+        """Get a player's 1-based mastery rank in the guild (0 if they have no profile)"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT 1 + (
+                        SELECT COUNT(*) FROM players
+                        WHERE guild_id = p.guild_id AND mastery_points > p.mastery_points
+                    )
+                    FROM players p
+                    WHERE p.user_id = %s AND p.guild_id = %s
+                """, (user_id, guild_id))
+                row = cursor.fetchone()
+                return row[0] if row else 0
+        except Exception as e:
+            logger.error("Error getting player rank: %s", e)
+            return 0
+    
     def update_player_build(self, user_id: int, guild_id: int, build_type: str) -> bool:
         """Update player's build type"""
         try:
@@ -411,7 +566,7 @@ class Database:
                 """, (build_type, user_id, guild_id))
             return True
         except Exception as e:
-            logger.error(f"Error updating player build: {e}")
+            logger.error("Error updating player build: %s", e)
             return False
     
     def delete_player(self, user_id: int, guild_id: int) -> bool:
@@ -419,23 +574,61 @@ class Database:
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                # Delete player (weapons will cascade)
+                # Player (weapons cascade), war participation and language
+                # preference all go in a single round trip
                 cursor.execute("""
-                    DELETE FROM players WHERE user_id = %s AND guild_id = %s
-                """, (user_id, guild_id))
-                # Also delete from war participants
-                cursor.execute("""
-                    DELETE FROM war_participants WHERE user_id = %s AND guild_id = %s
-                """, (user_id, guild_id))
-                # Delete language preference
-                cursor.execute("""
-                    DELETE FROM user_language WHERE user_id = %s AND guild_id = %s
-                """, (user_id, guild_id))
+                    WITH del_votes AS (
+                        DELETE FROM war_participants WHERE user_id = %(uid)s AND guild_id = %(gid)s
+                    ), del_lang AS (
+                        DELETE FROM user_language WHERE user_id = %(uid)s AND guild_id = %(gid)s
+                    )
+                    DELETE FROM players WHERE user_id = %(uid)s AND guild_id = %(gid)s
+                """, {"uid": user_id, "gid": guild_id})
             return True
         except Exception as e:
-            logger.error(f"Error deleting player: {e}")
+            logger.error("Error deleting player: %s", e)
             return False
     
+    def get_player_ids(self, guild_id: int) -> List[int]:
+        """Get the user IDs of every player registered in a guild"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT user_id FROM players WHERE guild_id = %s", (guild_id,))
+                return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error("Error getting player ids: %s", e)
+            return []
+
+    def clear_guild_data(self, guild_id: int) -> Optional[Dict[str, int]]:
+        """
+        Delete all player data for a guild in a single statement.
+        Returns the number of rows removed per table, or None on error.
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    WITH w AS (DELETE FROM player_weapons WHERE guild_id = %(gid)s RETURNING 1),
+                         wp AS (DELETE FROM war_participants WHERE guild_id = %(gid)s RETURNING 1),
+                         ul AS (DELETE FROM user_language WHERE guild_id = %(gid)s RETURNING 1),
+                         jr AS (DELETE FROM join_requests WHERE guild_id = %(gid)s RETURNING 1),
+                         p AS (DELETE FROM players WHERE guild_id = %(gid)s RETURNING 1)
+                    SELECT (SELECT COUNT(*) FROM p), (SELECT COUNT(*) FROM w), (SELECT COUNT(*) FROM wp),
+                           (SELECT COUNT(*) FROM ul), (SELECT COUNT(*) FROM jr)
+                """, {"gid": guild_id})
+                players, weapons, war, lang, join = cursor.fetchone()
+            return {
+                "players": players,
+                "weapons": weapons,
+                "war": war,
+                "language": lang,
+                "join_requests": join,
+            }
+        except Exception as e:
+            logger.error("Error clearing data for guild %s: %s", guild_id, e)
+            return None
+
     # ==================== WEAPON OPERATIONS ====================
     
     def add_weapon(self, user_id: int, guild_id: int, weapon_name: str) -> bool:
@@ -450,7 +643,7 @@ class Database:
                 """, (user_id, guild_id, weapon_name))
             return True
         except Exception as e:
-            logger.error(f"Error adding weapon: {e}")
+            logger.error("Error adding weapon: %s", e)
             return False
     
     def get_player_weapons(self, user_id: int, guild_id: int) -> List[str]:
@@ -464,7 +657,7 @@ class Database:
                 """, (user_id, guild_id))
                 return [row[0] for row in cursor.fetchall()]
         except Exception as e:
-            logger.error(f"Error getting player weapons: {e}")
+            logger.error("Error getting player weapons: %s", e)
             return []
     
     def set_player_weapons(self, user_id: int, guild_id: int, weapons: List[str]) -> bool:
@@ -486,7 +679,7 @@ class Database:
                     """, (user_id, guild_id, weapon))
             return True
         except Exception as e:
-            logger.error(f"Error setting player weapons: {e}")
+            logger.error("Error setting player weapons: %s", e)
             return False
     
     def remove_weapon(self, user_id: int, guild_id: int, weapon_name: str) -> bool:
@@ -500,7 +693,7 @@ class Database:
                 """, (user_id, guild_id, weapon_name))
             return True
         except Exception as e:
-            logger.error(f"Error removing weapon: {e}")
+            logger.error("Error removing weapon: %s", e)
             return False
     
     # ==================== WAR OPERATIONS ====================
@@ -519,7 +712,7 @@ class Database:
                 """, (user_id, guild_id, username, status))
             return True
         except Exception as e:
-            logger.error(f"Error adding war participant: {e}")
+            logger.error("Error adding war participant: %s", e)
             return False
     
     def get_war_participants(self, guild_id: int) -> List[Dict]:
@@ -534,7 +727,7 @@ class Database:
                 """, (guild_id,))
                 return [dict(row) for row in cursor.fetchall()]
         except Exception as e:
-            logger.error(f"Error getting war participants: {e}")
+            logger.error("Error getting war participants: %s", e)
             return []
     
     def get_war_participants_by_type(self, guild_id: int, poll_week: str = None) -> Dict:
@@ -556,7 +749,7 @@ class Database:
                         result["not_playing"].append(row)
                 return result
         except Exception as e:
-            logger.error(f"Error getting war participants by type: {e}")
+            logger.error("Error getting war participants by type: %s", e)
             return {"saturday": [], "sunday": [], "both": [], "not_playing": []}
     
     def set_war_participation(self, user_id: int, guild_id: int, poll_week: str, participation_type: str) -> bool:
@@ -573,7 +766,7 @@ class Database:
                 """, (user_id, guild_id, participation_type))
             return True
         except Exception as e:
-            logger.error(f"Error setting war participation: {e}")
+            logger.error("Error setting war participation: %s", e)
             return False
     
     def clear_war_participants(self, guild_id: int, poll_week: str) -> bool:
@@ -587,7 +780,7 @@ class Database:
                 """, (guild_id,))
             return True
         except Exception as e:
-            logger.error(f"Error clearing war participants: {e}")
+            logger.error("Error clearing war participants: %s", e)
             return False
     
     def clear_all_war_participants(self, guild_id: int) -> bool:
@@ -600,7 +793,7 @@ class Database:
                 """, (guild_id,))
             return True
         except Exception as e:
-            logger.error(f"Error clearing all war participants: {e}")
+            logger.error("Error clearing all war participants: %s", e)
             return False
     
     def was_event_sent(self, guild_id: int, event_type: str, poll_week: str, day: str = None) -> bool:
@@ -620,7 +813,7 @@ class Database:
                     """, (guild_id, event_type, poll_week))
                 return cursor.fetchone() is not None
         except Exception as e:
-            logger.error(f"Error checking event sent: {e}")
+            logger.error("Error checking event sent: %s", e)
             return False
     
     def mark_event_sent(self, guild_id: int, event_type: str, poll_week: str, day: str = None) -> bool:
@@ -635,7 +828,7 @@ class Database:
                 """, (guild_id, event_type, poll_week, day))
             return True
         except Exception as e:
-            logger.error(f"Error marking event sent: {e}")
+            logger.error("Error marking event sent: %s", e)
             return False
     
     def reset_war_data(self, guild_id: int) -> bool:
@@ -648,7 +841,7 @@ class Database:
                 """, (guild_id,))
             return True
         except Exception as e:
-            logger.error(f"Error resetting war data: {e}")
+            logger.error("Error resetting war data: %s", e)
             return False
     
     # ==================== LANGUAGE OPERATIONS ====================
@@ -666,7 +859,7 @@ class Database:
                 """, (user_id, guild_id, language))
             return True
         except Exception as e:
-            logger.error(f"Error setting user language: {e}")
+            logger.error("Error setting user language: %s", e)
             return False
     
     def get_user_language(self, user_id: int, guild_id: int) -> str:
@@ -680,9 +873,23 @@ class Database:
                 row = cursor.fetchone()
                 return row[0] if row else 'ar'
         except Exception as e:
-            logger.error(f"Error getting user language: {e}")
+            logger.error("Error getting user language: %s", e)
             return 'ar'
     
+    def get_user_language_preference(self, user_id: int, guild_id: int) -> Optional[str]:
+        """Get user's chosen language in a single query, or None if they haven't picked one"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT language FROM user_language WHERE user_id = %s AND guild_id = %s
+                """, (user_id, guild_id))
+                row = cursor.fetchone()
+                return row[0] if row else None
+        except Exception as e:
+            logger.error("Error getting user language preference: %s", e)
+            return None
+    
     def has_language_preference(self, user_id: int, guild_id: int) -> bool:
         """Check if user has a language preference set"""
         try:
@@ -693,7 +900,7 @@ class Database:
                 """, (user_id, guild_id))
                 return cursor.fetchone() is not None
         except Exception as e:
-            logger.error(f"Error checking user language: {e}")
+            logger.error("Error checking user language: %s", e)
             return False
     
     # Alias for backward compatibility
@@ -713,46 +920,70 @@ class Database:
                 """, (guild_id,))
                 row = cursor.fetchone()
                 
-                if row:
-                    return dict(row)
-                else:
-                    # Create default settings
+                if row is None:
+                    # Create default settings and read them back in the same statement
                     cursor.execute("""
                         INSERT INTO server_settings (guild_id) VALUES (%s)
+                        ON CONFLICT (guild_id) DO NOTHING
+                        RETURNING *
                     """, (guild_id,))
-            # Recursively get the newly created settings
-            return self.get_server_settings(guild_id)
+                    row = cursor.fetchone()
+                    if row is None:
+                        # Another connection created the row first
+                        cursor.execute("""
+                            SELECT * FROM server_settings WHERE guild_id = %s
+                        """, (guild_id,))
+                        row = cursor.fetchone()
+                return dict(row) if row else {}
         except Exception as e:
-            logger.error(f"Error getting server settings: {e}")
+            logger.error("Error getting server settings: %s", e)
             return {}
     
     def update_server_setting(self, guild_id: int, setting_name: str, value) -> bool:
         """Update a specific server setting"""
         if setting_name not in ALLOWED_SETTINGS:
-            logger.error(f"Invalid setting name: {setting_name}")
+            logger.error("Invalid setting name: %s", setting_name)
             return False
         
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                # Ensure server settings exist
-                cursor.execute("""
-                    INSERT INTO server_settings (guild_id) 
-                    VALUES (%s)
-                    ON CONFLICT (guild_id) DO NOTHING
-                """, (guild_id,))
-                
-                # Update the specific setting
+                # Create the settings row if needed and set the value in one write
                 cursor.execute(f"""
-                    UPDATE server_settings 
-                    SET {setting_name} = %s
-                    WHERE guild_id = %s
-                """, (value, guild_id))
+                    INSERT INTO server_settings (guild_id, {setting_name})
+                    VALUES (%s, %s)
+                    ON CONFLICT (guild_id) DO UPDATE SET {setting_name} = EXCLUDED.{setting_name}
+                """, (guild_id, value))
             return True
         except Exception as e:
-            logger.error(f"Error updating server setting: {e}")
+            logger.error("Error updating server setting: %s", e)
             return False
     
+    def update_server_settings(self, guild_id: int, settings: Dict) -> Optional[Dict]:
+        """Update several server settings in one upsert; returns the updated settings row or None on error"""
+        if not settings:
+            return self.get_server_settings(guild_id)
+        invalid = [name for name in settings if name not in ALLOWED_SETTINGS]
+        if invalid:
+            logger.error("Invalid setting names: %s", invalid)
+            return None
+        
+        columns = list(settings)
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                cursor.execute(f"""
+                    INSERT INTO server_settings (guild_id, {", ".join(columns)})
+                    VALUES (%s{", %s" * len(columns)})
+                    ON CONFLICT (guild_id) DO UPDATE SET
+                        {", ".join(f"{c} = EXCLUDED.{c}" for c in columns)}
+                    RETURNING *
+                """, (guild_id, *settings.values()))
+                return dict(cursor.fetchone())
+        except Exception as e:
+            logger.error("Error updating server settings: %s", e)
+            return None
+    
     # ==================== EVENT TRACKING OPERATIONS ====================
     
     def record_sent_event(self, guild_id: int, event_type: str) -> bool:
@@ -766,7 +997,7 @@ class Database:
                 """, (guild_id, event_type))
             return True
         except Exception as e:
-            logger.error(f"Error recording sent event: {e}")
+            logger.error("Error recording sent event: %s", e)
             return False
     
     def clear_old_events(self, guild_id: int, older_than_date: datetime) -> bool:
@@ -780,7 +1011,7 @@ class Database:
                 """, (guild_id, older_than_date.strftime("%Y-%m-%d %H:%M:%S")))
             return True
         except Exception as e:
-            logger.error(f"Error clearing old events for guild {guild_id}: {e}")
+            logger.error("Error clearing old events for guild %s: %s", guild_id, e)
             return False
     
     # ==================== JOIN REQUEST OPERATIONS ====================
@@ -803,7 +1034,7 @@ class Database:
                 """, (user_id, guild_id, language, in_game_name, level, power, admin_message_id))
                 return cursor.fetchone()[0]
         except Exception as e:
-            logger.error(f"Error creating join request: {e}")
+            logger.error("Error creating join request: %s", e)
             return None
     
     def get_join_request(self, request_id: int) -> Optional[Dict]:
@@ -817,7 +1048,7 @@ class Database:
                 row = cursor.fetchone()
                 return dict(row) if row else None
         except Exception as e:
-            logger.error(f"Error getting join request: {e}")
+            logger.error("Error getting join request: %s", e)
             return None
     
     def get_pending_join_requests(self, guild_id: int) -> List[Dict]:
@@ -832,9 +1063,27 @@ class Database:
                 """, (guild_id,))
                 return [dict(row) for row in cursor.fetchall()]
         except Exception as e:
-            logger.error(f"Error getting pending join requests: {e}")
+            logger.error("Error getting pending join requests: %s", e)
             return []
     
+    def get_pending_join_requests_page(self, guild_id: int, limit: int = 10) -> Tuple[List[Dict], int]:
+        """Get the newest `limit` pending join requests for a guild plus the total pending count"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                # The window count is taken before LIMIT, so it covers every pending row
+                cursor.execute("""
+                    SELECT *, COUNT(*) OVER () AS total FROM join_requests
+                    WHERE guild_id = %s AND status = 'pending'
+                    ORDER BY requested_at DESC
+                    LIMIT %s
+                """, (guild_id, limit))
+                rows = [dict(row) for row in cursor.fetchall()]
+                return rows, (rows[0]['total'] if rows else 0)
+        except Exception as e:
+            logger.error("Error getting pending join requests page: %s", e)
+            return [], 0
+    
     def update_join_request_status(self, request_id: int, status: str, reviewed_by: int, rejection_reason: str = None) -> bool:
         """Update join request status"""
         try:
@@ -848,7 +1097,7 @@ class Database:
                 """, (status, reviewed_by, rejection_reason, request_id))
             return True
         except Exception as e:
-            logger.error(f"Error updating join request status: {e}")
+            logger.error("Error updating join request status: %s", e)
             return False
     
     def set_join_settings(self, guild_id: int, join_channel_id: int, 
@@ -868,7 +1117,7 @@ class Database:
                 """, (guild_id, join_channel_id, approval_channel_id, min_power))
             return True
         except Exception as e:
-            logger.error(f"Error updating join settings: {e}")
+            logger.error("Error updating join settings: %s", e)
             return False
     
     def get_join_settings(self, guild_id: int) -> Optional[Dict]:
@@ -883,7 +1132,7 @@ class Database:
                 row = cursor.fetchone()
                 return dict(row) if row else None
         except Exception as e:
-            logger.error(f"Error getting join settings: {e}")
+            logger.error("Error getting join settings: %s", e)
             return None
     
     def update_join_settings(self, guild_id: int, join_channel_id: int = None, 
@@ -932,7 +1181,7 @@ class Database:
                     """, (guild_id, join_channel_id, admin_review_channel_id or join_channel_id, build_setup_channel_id, min_power_requirement or 0))
             return True
         except Exception as e:
-            logger.error(f"Error updating join settings: {e}")
+            logger.error("Error updating join settings: %s", e)
             return False
     
     def set_welcome_message_id(self, guild_id: int, message_id: int) -> bool:
@@ -947,7 +1196,7 @@ class Database:
                 """, (message_id, guild_id))
             return True
         except Exception as e:
-            logger.error(f"Error setting welcome message ID: {e}")
+            logger.error("Error setting welcome message ID: %s", e)
             return False
 
     # ==================== BUILDS & WEAPONS CRUD ====================
@@ -961,7 +1210,7 @@ class Database:
                 cols = [d[0] for d in cursor.description]
                 return [dict(zip(cols, row)) for row in cursor.fetchall()]
         except Exception as e:
-            logger.error(f"Error fetching builds: {e}")
+            logger.error("Error fetching builds: %s", e)
             return []
 
     def get_weapons(self, build_name: str) -> list:
@@ -976,7 +1225,7 @@ class Database:
                 cols = [d[0] for d in cursor.description]
                 return [dict(zip(cols, row)) for row in cursor.fetchall()]
         except Exception as e:
-            logger.error(f"Error fetching weapons for {build_name}: {e}")
+            logger.error("Error fetching weapons for %s: %s", build_name, e)
             return []
 
     def get_all_weapons(self) -> list:
@@ -988,7 +1237,7 @@ class Database:
                 cols = [d[0] for d in cursor.description]
                 return [dict(zip(cols, row)) for row in cursor.fetchall()]
         except Exception as e:
-            logger.error(f"Error fetching all weapons: {e}")
+            logger.error("Error fetching all weapons: %s", e)
             return []
 
     def get_weapon_by_name(self, name: str) -> dict | None:
@@ -1002,7 +1251,7 @@ class Database:
                     cols = [d[0] for d in cursor.description]
                     return dict(zip(cols, row))
         except Exception as e:
-            logger.error(f"Error fetching weapon {name}: {e}")
+            logger.error("Error fetching weapon %s: %s", name, e)
         return None
 
     def add_build(self, name: str, emoji: str, description: str = "") -> bool:
@@ -1016,7 +1265,7 @@ class Database:
                 )
             return True
         except Exception as e:
-            logger.error(f"Error adding build {name}: {e}")
+            logger.error("Error adding build %s: %s", name, e)
             return False
 
     def remove_build(self, name: str) -> bool:
@@ -1027,7 +1276,7 @@ class Database:
                 cursor.execute("DELETE FROM builds WHERE name = %s", (name,))
                 return cursor.rowcount > 0
         except Exception as e:
-            logger.error(f"Error removing build {name}: {e}")
+            logger.error("Error removing build %s: %s", name, e)
             return False
 
     def add_weapon(self, name: str, emoji: str, build_name: str) -> bool:
@@ -1041,7 +1290,7 @@ class Database:
                 )
             return True
         except Exception as e:
-            logger.error(f"Error adding weapon {name}: {e}")
+            logger.error("Error adding weapon %s: %s", name, e)
             return False
 
     def remove_weapon(self, name: str) -> bool:
@@ -1052,7 +1301,7 @@ class Database:
                 cursor.execute("DELETE FROM weapons WHERE name = %s", (name,))
                 return cursor.rowcount > 0
         except Exception as e:
-            logger.error(f"Error removing weapon {name}: {e}")
+            logger.error("Error removing weapon %s: %s", name, e)
             return False
 
     # ==================== WAR EVENTS CRUD ====================
@@ -1106,11 +1355,11 @@ class Database:
                     )
                     cols = [d[0] for d in cursor.description]
                     rows = [dict(zip(cols, r)) for r in cursor.fetchall()]
-                    logger.info(f"Seeded war_events for guild {guild_id} from server_settings")
+                    logger.info("Seeded war_events for guild %s from server_settings", guild_id)
 
                 return rows
         except Exception as e:
-            logger.error(f"Error fetching war events for guild {guild_id}: {e}")
+            logger.error("Error fetching war events for guild %s: %s", guild_id, e)
             return []
 
     def add_war_event(self, guild_id: int, name: str, day_of_week: str,
@@ -1126,7 +1375,7 @@ class Database:
                 )
             return True
         except Exception as e:
-            logger.error(f"Error adding war event {name}: {e}")
+            logger.error("Error adding war event %s: %s", name, e)
             return False
 
     def remove_war_event(self, guild_id: int, name: str) -> bool:
@@ -1140,7 +1389,7 @@ class Database:
                 )
                 return cursor.rowcount > 0
         except Exception as e:
-            logger.error(f"Error removing war event {name}: {e}")
+            logger.error("Error removing war event %s: %s", name, e)
             return False
 
     def toggle_war_event(self, guild_id: int, name: str) -> bool | None:
@@ -1156,7 +1405,7 @@ class Database:
                 row = cursor.fetchone()
                 return row[0] if row else None
         except Exception as e:
-            logger.error(f"Error toggling war event {name}: {e}")
+            logger.error("Error toggling war event %s: %s", name, e)
             return None
 
     # ==================== WAR EVENT VOTES ====================
@@ -1175,23 +1424,80 @@ class Database:
                 """, (guild_id, user_id, event_name, poll_week, playing))
             return True
         except Exception as e:
-            logger.error(f"Error setting war vote: {e}")
+            logger.error("Error setting war vote: %s", e)
             return False
 
-    def get_war_votes(self, guild_id: int, event_name: str, poll_week: str) -> list:
-        """Return all votes for a specific event this week."""
+    def record_war_vote(self, guild_id: int, user_id: int,
+                        event_name: str, poll_week: str, playing: bool) -> Optional[Tuple[bool, Optional[bool]]]:
+        """
+        Record a poll click in one statement: check the profile, read the previous vote
+        and upsert only if it changed. Returns (has_profile, previous_vote), or None on error.
+        """
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
+                # Every part of a data-modifying CTE reads the same pre-write snapshot,
+                # so `prev` (and the final SELECT) still see the old vote
                 cursor.execute("""
+                    WITH profile AS (
+                        SELECT 1 FROM players WHERE user_id = %(user_id)s AND guild_id = %(guild_id)s
+                    ), prev AS (
+                        SELECT playing FROM war_event_votes
+                        WHERE guild_id = %(guild_id)s AND user_id = %(user_id)s
+                          AND event_name = %(event_name)s AND poll_week = %(poll_week)s
+                    ), upsert AS (
+                        INSERT INTO war_event_votes (guild_id, user_id, event_name, poll_week, playing)
+                        SELECT %(guild_id)s, %(user_id)s, %(event_name)s, %(poll_week)s, %(playing)s
+                        WHERE EXISTS (SELECT 1 FROM profile)
+                          -- Repeat clicks on the same button skip the write
+                          AND (SELECT playing FROM prev) IS DISTINCT FROM %(playing)s
+                        ON CONFLICT (guild_id, user_id, event_name, poll_week)
+                        DO UPDATE SET playing = EXCLUDED.playing, voted_at = CURRENT_TIMESTAMP
+                    )
+                    SELECT EXISTS (SELECT 1 FROM profile), (SELECT playing FROM prev)
+                """, {"guild_id": guild_id, "user_id": user_id, "event_name": event_name,
+                      "poll_week": poll_week, "playing": playing})
+                has_profile, prev = cursor.fetchone()
+                return has_profile, (prev if has_profile else None)
+        except Exception as e:
+            logger.error("Error recording war vote: %s", e)
+            return None
+
+    def get_war_votes(self, guild_id: int, event_name: str, poll_week: str, playing_only: bool = False) -> list:
+        """Return all votes for a specific event this week (only 'playing' ones if playing_only)."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                query = """
                     SELECT user_id, playing FROM war_event_votes
                     WHERE guild_id = %s AND event_name = %s AND poll_week = %s
-                """, (guild_id, event_name, poll_week))
+                """
+                if playing_only:
+                    query += " AND playing"
+                cursor.execute(query, (guild_id, event_name, poll_week))
                 return [{"user_id": r[0], "playing": r[1]} for r in cursor.fetchall()]
         except Exception as e:
-            logger.error(f"Error fetching war votes: {e}")
+            logger.error("Error fetching war votes: %s", e)
             return []
 
+    def get_playing_ids_by_event(self, guild_id: int, poll_week: str) -> dict:
+        """Return {event_name: [user_id, ...]} of 'playing' votes for every event this week in one query."""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT event_name, user_id FROM war_event_votes
+                    WHERE guild_id = %s AND poll_week = %s AND playing
+                    ORDER BY voted_at
+                """, (guild_id, poll_week))
+                result = {}
+                for event_name, user_id in cursor.fetchall():
+                    result.setdefault(event_name, []).append(user_id)
+                return result
+        except Exception as e:
+            logger.error("Error fetching war votes by event: %s", e)
+            return {}
+
     def get_user_war_vote(self, guild_id: int, user_id: int,
                           event_name: str, poll_week: str) -> bool | None:
         """Return the user's vote for an event (True=playing, False=not, None=no vote)."""
@@ -1205,7 +1511,7 @@ class Database:
                 row = cursor.fetchone()
                 return row[0] if row else None
         except Exception as e:
-            logger.error(f"Error fetching user war vote: {e}")
+            logger.error("Error fetching user war vote: %s", e)
             return None
 
     def clear_war_event_votes(self, guild_id: int, event_name: str, poll_week: str) -> bool:
@@ -1219,7 +1525,7 @@ class Database:
                 )
             return True
         except Exception as e:
-            logger.error(f"Error clearing war event votes: {e}")
+            logger.error("Error clearing war event votes: %s", e)
             return False
 
 
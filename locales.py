@@ -4,21 +4,27 @@ Loads translations from locales.json for easy editing.
 """
 
 import json
+import sys
 from pathlib import Path
 import logging
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # orjson is optional; stdlib json is the fallback
+    _json_loads = json.loads
+
 logger = logging.getLogger(__name__)
 
 # Load languages from JSON file
 LOCALES_FILE = Path(__file__).parent / "locales.json"
 
 try:
-    with open(LOCALES_FILE, 'r', encoding='utf-8') as f:
-        LANGUAGES = json.load(f)
-    logger.info(f"✅ Loaded {len(LANGUAGES)} language(s) from {LOCALES_FILE}")
+    LANGUAGES = _json_loads(LOCALES_FILE.read_bytes())
+    logger.info("✅ Loaded %s language(s) from %s", len(LANGUAGES), LOCALES_FILE)
 except FileNotFoundError:
     # Fallback to minimal English if JSON file is missing
-    logger.warning(f"⚠️ {LOCALES_FILE} not found, using minimal English fallback")
+    logger.warning("⚠️ %s not found, using minimal English fallback", LOCALES_FILE)
     LANGUAGES = {
         "en": {
             "dm_only": "This command can only be used in a server.",
@@ -27,5 +33,35 @@ except FileNotFoundError:
         }
     }
 except json.JSONDecodeError as e:
-    logger.error(f"❌ Error loading {LOCALES_FILE}: {e}")
+    logger.error("❌ Error loading %s: %s", LOCALES_FILE, e)
     LANGUAGES = {"en": {}}
+
+# Flat (lang, key) → text table with English values filled in for any key a
+# language is missing, so lookups are a single dict probe.
+_EN = LANGUAGES.get("en", {})
+LANGUAGES_FLAT = {
+    (lang, sys.intern(key)): text
+    for lang, strings in LANGUAGES.items()
+    for key, text in {**_EN, **strings}.items()
+}
+
+
+class TextBundle(dict):
+    """A language's strings with English filled in; unknown keys return the key itself (like get_text)."""
+
+    def __missing__(self, key):
+        return key
+
+
+# One pre-merged bundle per language, handed out by utils.helpers.get_text_bundle
+# so a handler resolves the language once and then indexes t["key"].
+LANGUAGE_BUNDLES = {
+    lang: TextBundle({**_EN, **strings})
+    for lang, strings in LANGUAGES.items()
+}
+
+# Display names for language codes (slash-command choices and /mylanguage)
+LANGUAGE_NAMES = {
+    "en": "English",
+    "ar": "العربية (Arabic)",
+}
@@ -28,7 +28,7 @@ def migrate():
         cursor.execute("SELECT * FROM server_join_settings")
         existing_data = cursor.fetchall()
         
-        logger.info(f"Found {len(existing_data)} existing rows")
+        logger.info("Found %s existing rows", len(existing_data))
         
         # Drop the old table
         cursor.execute("DROP TABLE IF EXISTS server_join_settings")
@@ -54,7 +54,7 @@ def migrate():
                 (guild_id, join_channel_id, admin_review_channel_id, min_power_requirement, welcome_message_id, build_setup_channel_id)
                 VALUES (?, ?, ?, ?, ?, ?)
             """, existing_data)
-            logger.info(f"Restored {len(existing_data)} rows")
+            logger.info("Restored %s rows", len(existing_data))
         
         conn.commit()
         conn.close()
@@ -62,7 +62,7 @@ def migrate():
         logger.info("✅ Migration completed successfully!")
         
     except Exception as e:
-        logger.error(f"❌ Migration failed: {e}", exc_info=True)
+        logger.error("❌ Migration failed: %s", e, exc_info=True)
         raise
 
 if __name__ == "__main__":
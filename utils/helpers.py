@@ -4,10 +4,13 @@ Includes localization, timestamp generation, and Discord-specific utilities.
 """
 
 import discord
-import pytz
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date, time as dt_time
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
+from functools import lru_cache
 import logging
 import time
+from locales import LANGUAGES as _LANGUAGES, LANGUAGES_FLAT, LANGUAGE_BUNDLES, TextBundle
+from utils.war_helpers import days_until
 
 logger = logging.getLogger(__name__)
 
@@ -29,10 +32,9 @@ def _get_cached_lang(db, guild_id: int, user_id: int | None) -> str:
         if now - ts < _LANG_CACHE_TTL:
             return lang
 
-    # Cache miss — resolve from DB
-    if user_id and db.has_user_chosen_language(user_id, guild_id):
-        lang = db.get_user_language(user_id, guild_id)
-    else:
+    # Cache miss — resolve from DB (one query for the user's own choice)
+    lang = db.get_user_language_preference(user_id, guild_id) if user_id else None
+    if lang is None:
         settings = db.get_server_settings(guild_id)
         lang = settings.get('language', 'en') if settings else 'en'
 
@@ -43,6 +45,13 @@ def _get_cached_lang(db, guild_id: int, user_id: int | None) -> str:
 def invalidate_lang_cache(user_id: int, guild_id: int):
     """Call this after /mylanguage changes so the new setting takes effect immediately."""
     _lang_cache.pop((user_id, guild_id), None)
+
+
+def invalidate_guild_lang_cache(guild_id: int):
+    """Call this after /setlanguage so every cached member of the guild picks up the new server language."""
+    # list() snapshots the keys first: async_run worker threads insert into the cache concurrently
+    for key in [k for k in list(_lang_cache) if k[1] == guild_id]:
+        _lang_cache.pop(key, None)
 # ─────────────────────────────────────────────────────────────────────────────
 
 
@@ -75,13 +84,28 @@ def get_text(db, LANGUAGES: dict, guild_id: int, key: str, user_id: int = None,
     Returns:
         Translated text string
     """
-    if guild_id is None:
-        return LANGUAGES['en'].get(key, key)
-
-    lang = _get_cached_lang(db, guild_id, user_id)
+    lang = 'en' if guild_id is None else _get_cached_lang(db, guild_id, user_id)
+    if LANGUAGES is _LANGUAGES:
+        # Fast path: one probe into the pre-merged table (unknown languages fall back to English)
+        text = LANGUAGES_FLAT.get((lang, key))
+        return text if text is not None else LANGUAGES_FLAT.get(('en', key), key)
     return LANGUAGES.get(lang, LANGUAGES['en']).get(key, key)
 
 
+def resolve_language(db, guild_id: int, user_id: int = None) -> str:
+    """Language code get_text would use for this user/guild (cached, see _get_cached_lang)."""
+    return 'en' if guild_id is None else _get_cached_lang(db, guild_id, user_id)
+
+
+def get_text_bundle(db, guild_id: int, user_id: int = None) -> TextBundle:
+    """
+    Resolve the language once and return all of its strings.
+    Use in handlers that need many keys: t = get_text_bundle(...); t["key"].
+    Missing keys return the key itself, same as get_text.
+    """
+    lang = resolve_language(db, guild_id, user_id)
+    return LANGUAGE_BUNDLES.get(lang) or LANGUAGE_BUNDLES.get('en') or TextBundle()
+
 
 async def update_member_nickname(member: discord.Member, new_name: str) -> tuple[bool, str]:
     """
@@ -103,11 +127,52 @@ async def update_member_nickname(member: discord.Member, new_name: str) -> tuple
         return False, f"⚠️ Couldn't update server nickname: {str(e)}"
     except Exception as e:
         # Unexpected error
-        logger.error(f"Error updating nickname: {e}")
+        logger.error("Error updating nickname: %s", e)
         return False, "⚠️ Error updating server nickname"
 
 
-def get_discord_timestamp(hour: int, minute: int, days_ahead: int = 0, timezone_str: str = "Africa/Cairo") -> str:
+def join_mentions(user_ids, limit: int = 1024) -> str:
+    """
+    Join user mentions with spaces, stopping before the text would exceed limit.
+    Dropped users are summarised as "+N more" so a mention is never cut in half.
+    """
+    parts = []
+    length = 0
+    for i, uid in enumerate(user_ids):
+        mention = f"<@{uid}>"
+        # Reserve room for the "+N more" suffix in case this is not the last one
+        if length + len(mention) + 1 > limit - 10:
+            parts.append(f"+{len(user_ids) - i} more")
+            break
+        parts.append(mention)
+        length += len(mention) + 1
+    return " ".join(parts)
+
+
+@lru_cache(maxsize=1)
+def _zone_names_by_lower() -> dict:
+    """Map every lower-cased IANA zone name to its canonical spelling (built once)."""
+    return {name.lower(): name for name in available_timezones()}
+
+
+@lru_cache(maxsize=16)
+def get_timezone(timezone_str: str = "Africa/Cairo") -> ZoneInfo:
+    """
+    Return the ZoneInfo for a guild timezone name, memoized per name.
+    ZoneInfo keys are case-sensitive, but pytz was not, so stored names such as
+    "africa/cairo" are matched case-insensitively; .key gives the canonical name.
+    """
+    try:
+        return ZoneInfo(timezone_str)
+    except (ZoneInfoNotFoundError, ValueError):
+        canonical = _zone_names_by_lower().get(timezone_str.strip().lower())
+        if canonical is None:
+            raise
+        return ZoneInfo(canonical)
+
+
+def get_discord_timestamp(hour: int, minute: int, days_ahead: int = 0, timezone_str: str = "Africa/Cairo",
+                          today: date = None) -> str:
     """
     Get Discord timestamp for a specific time.
     Discord automatically displays this in each user's local timezone.
@@ -117,14 +182,22 @@ def get_discord_timestamp(hour: int, minute: int, days_ahead: int = 0, timezone_
         minute: Minute (0-59)
         days_ahead: Number of days in the future (0 for today)
         timezone_str: Timezone string (e.g., 'Africa/Cairo', 'UTC')
+        today: Current date in that timezone, if the caller already has it
     
     Returns:
         Discord timestamp string like <t:1234567890:t> which Discord renders in user's timezone
     """
-    tz = pytz.timezone(timezone_str)
-    now = datetime.now(tz)
-    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
-    target = target + timedelta(days=days_ahead)
+    if today is None:
+        today = datetime.now(get_timezone(timezone_str)).date()
+    return _cached_discord_timestamp(hour, minute, days_ahead, timezone_str, today)
+
+
+@lru_cache(maxsize=64)
+def _cached_discord_timestamp(hour: int, minute: int, days_ahead: int, timezone_str: str, today: date) -> str:
+    """Pure helper behind get_discord_timestamp; the date in the key rolls the cache over at midnight."""
+    target = datetime.combine(
+        today + timedelta(days=days_ahead), dt_time(hour, minute), tzinfo=get_timezone(timezone_str)
+    )
     unix_timestamp = int(target.timestamp())
     # Format options:
     # :t = short time (e.g., 16:20)
@@ -141,8 +214,10 @@ def get_next_war_timestamps():
     """Get Discord timestamps for next Saturday and Sunday wars"""
     # This will be called per-guild with their specific war times
     # For now, using default times
-    saturday_time = get_discord_timestamp(22, 30, 0 if datetime.now().weekday() == 5 else 1)
-    sunday_time = get_discord_timestamp(22, 30, 0 if datetime.now().weekday() == 6 else 1)
+    weekday = datetime.now().weekday()
+    # Days until the next Saturday (5) / Sunday (6), 0 if it is today
+    saturday_time = get_discord_timestamp(22, 30, days_until(5, weekday))
+    sunday_time = get_discord_timestamp(22, 30, days_until(6, weekday))
     return saturday_time, sunday_time
 
 
@@ -165,11 +240,52 @@ async def validate_war_channel(channel_id: int, guild: discord.Guild) -> tuple:
     return True, "OK"
 
 
-async def remove_all_build_roles(member: discord.Member, guild: discord.Guild, db=None):
+def get_build_role_names(db=None) -> frozenset:
     """
-    Remove all build and weapon roles from a member.
+    Every role name that counts as a build/weapon role (plain and emoji-prefixed).
     Reads build/weapon names from the database when db is supplied,
     falling back to the hardcoded config when db is None.
+    """
+    if db is not None:
+        try:
+            from config import get_builds_config
+            builds = get_builds_config(db)
+            build_names = list(builds.keys())
+            all_weapons = db.get_all_weapons()
+            weapon_names = [w["name"] for w in all_weapons]
+            # Include emoji-prefixed role names
+            weapon_emojis = {w["name"]: w.get("emoji", "") for w in all_weapons}
+            build_emojis = {n: builds[n].get("emoji", "") for n in build_names}
+        except Exception:
+            db = None
+    if db is None:
+        from config import BUILDS, WEAPON_ICONS
+        build_names = list(BUILDS.keys())
+        weapon_names = list(WEAPON_ICONS.keys())
+        build_emojis = {n: BUILDS[n]["emoji"] for n in build_names}
+        weapon_emojis = {w: "" for w in weapon_names}
+
+    return frozenset(
+        name
+        for names, emojis in ((build_names, build_emojis), (weapon_names, weapon_emojis))
+        for n in names
+        for name in (n, f"{emojis.get(n, '')} {n}".strip())
+    )
+
+
+async def remove_all_build_roles(member: discord.Member, guild: discord.Guild, db=None, add_roles=None,
+                                 role_names: frozenset = None, reason: str = "Build reset"):
+    """
+    Remove all build and weapon roles from a member.
+    The role names come from get_build_role_names(db); callers handling many
+    members can compute that once and pass it in as role_names.
+
+    Any roles passed in add_roles are granted in the same request, so a
+    build/weapon change is a single member edit instead of one call per role.
+    The edit replaces the member's whole role list as seen in the cache, so a
+    role granted moments earlier (e.g. by another bot) that has not reached
+    the cache yet is dropped. That is the price of the single request.
+    reason is recorded in the guild's audit log.
 
     Returns:
         tuple: (success: bool, removed_count: int)
@@ -177,55 +293,35 @@ async def remove_all_build_roles(member: discord.Member, guild: discord.Guild, d
     removed_count = 0
 
     try:
-        # Collect build names and weapon names to remove
-        if db is not None:
+        if role_names is None:
+            role_names = get_build_role_names(db)
+
+        # Roles at or above the bot's top role (or managed by an integration) can't be
+        # assigned; leaving them out up front keeps one bad role from failing the whole edit
+        bot_top_role = guild.me.top_role if guild and guild.me else None
+
+        def _assignable(role):
+            return not role.managed and (bot_top_role is None or role < bot_top_role)
+
+        # One pass over the member's own roles instead of a guild.roles scan per name
+        to_add = [role for role in (add_roles or ()) if role and _assignable(role)]
+        to_remove = [
+            role for role in member.roles
+            if role.name in role_names and role not in to_add and _assignable(role)
+        ]
+        missing = [role for role in to_add if role not in member.roles]
+
+        # Apply the whole change as one member edit (add/remove_roles default to one request per role)
+        if to_remove or missing:
+            keep = [role for role in member.roles if not role.is_default() and role not in to_remove]
             try:
-                from config import get_builds_config
-                builds = get_builds_config(db)
-                build_names = list(builds.keys())
-                all_weapons = db.get_all_weapons()
-                weapon_names = [w["name"] for w in all_weapons]
-                # Include emoji-prefixed role names
-                weapon_emojis = {w["name"]: w.get("emoji", "") for w in all_weapons}
-                build_emojis = {n: builds[n].get("emoji", "") for n in build_names}
-            except Exception:
-                from config import BUILDS, WEAPON_ICONS
-                builds = BUILDS
-                build_names = list(BUILDS.keys())
-                weapon_names = list(WEAPON_ICONS.keys())
-                build_emojis = {n: BUILDS[n]["emoji"] for n in build_names}
-                weapon_emojis = {w: "" for w in weapon_names}
-        else:
-            from config import BUILDS, WEAPON_ICONS
-            build_names = list(BUILDS.keys())
-            weapon_names = list(WEAPON_ICONS.keys())
-            build_emojis = {n: BUILDS[n]["emoji"] for n in build_names}
-            weapon_emojis = {w: "" for w in weapon_names}
-
-        # Remove build roles (plain name and emoji-prefixed variants)
-        for build_name in build_names:
-            for role_name in [build_name, f"{build_emojis.get(build_name, '')} {build_name}".strip()]:
-                role = discord.utils.get(guild.roles, name=role_name)
-                if role and role in member.roles:
-                    try:
-                        await member.remove_roles(role)
-                        removed_count += 1
-                    except Exception:
-                        pass
-
-        # Remove weapon roles
-        for weapon_name in weapon_names:
-            for role_name in [weapon_name, f"{weapon_emojis.get(weapon_name, '')} {weapon_name}".strip()]:
-                role = discord.utils.get(guild.roles, name=role_name)
-                if role and role in member.roles:
-                    try:
-                        await member.remove_roles(role)
-                        removed_count += 1
-                    except Exception:
-                        pass
+                await member.edit(roles=keep + missing, reason=reason)
+                removed_count = len(to_remove)
+            except discord.HTTPException:
+                pass
 
         return True, removed_count
     except Exception as e:
-        logger.error(f"Error removing build roles from {member.id}: {e}")
+        logger.error("Error removing build roles from %s: %s", member.id, e)
         return False, removed_count
 
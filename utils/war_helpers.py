@@ -3,12 +3,30 @@ War system helper functions.
 Handles war participation tracking, configuration, and database operations.
 """
 
-from datetime import datetime
+from datetime import date, datetime, time as dt_time, timedelta
+
+# (week id, POSIX time the week ends) — a single tuple so worker threads never see half an update
+_poll_week_cache: tuple = ("", 0.0)
 
 
 def get_current_poll_week() -> str:
-    """Get current poll week identifier (e.g., '2024-W01')"""
-    return datetime.now().strftime("%Y-W%U")
+    """Get current poll week identifier (e.g., '2024-W01'), cached until the week rolls over"""
+    global _poll_week_cache
+    week, ends_at = _poll_week_cache
+    now = datetime.now()
+    if now.timestamp() < ends_at:
+        return week
+    week = now.strftime("%Y-W%U")
+    # %U weeks start on Sunday, and the year part resets on 1 January, so the id
+    # changes at whichever local midnight comes first
+    next_sunday = now.date() + timedelta(days=7 - (now.weekday() + 1) % 7)
+    rollover = min(next_sunday, date(now.year + 1, 1, 1))
+    _poll_week_cache = (week, datetime.combine(rollover, dt_time()).timestamp())
+    return week
+
+
+# Valid choices for the legacy day-based participation poll
+PARTICIPATION_CHOICES = frozenset(("saturday", "sunday", "both", "none"))
 
 
 def get_war_participants(db, guild_id: int, poll_week: str = None) -> dict:
@@ -32,7 +50,7 @@ def set_war_participation(db, guild_id: int, user_id: int, day_choice: str):
     poll_week = get_current_poll_week()
     
     # Set participation (this automatically replaces any existing participation)
-    if day_choice in ["saturday", "sunday", "both", "none"]:
+    if day_choice in PARTICIPATION_CHOICES:
         # Store as "not_playing" in DB to match get_war_participants_by_type
         stored = "not_playing" if day_choice == "none" else day_choice
         db.set_war_participation(user_id, guild_id, poll_week, stored)
@@ -45,16 +63,32 @@ DAY_MAP = {
 }
 
 
+def days_until(target_weekday: int, from_weekday: int) -> int:
+    """Return the number of days from 'from_weekday' until the next 'target_weekday' (0 = today)."""
+    return (target_weekday - from_weekday) % 7
+
+
 def get_war_config(db, guild_id: int) -> dict:
     """Get war configuration for a guild"""
-    settings = db.get_server_settings(guild_id)
-    
+    return war_config_from_settings(db.get_server_settings(guild_id))
+
+
+def war_config_from_settings(settings: dict) -> dict:
+    """Build the war configuration dict from a server_settings row"""
+    poll_day = settings.get('poll_day', 'Friday')
+    poll_hour = int(settings.get('poll_time_hour', 15))
+    poll_minute = int(settings.get('poll_time_minute', 0))
+
     return {
-        "poll_day": settings.get('poll_day', 'Friday'),
+        "poll_day": poll_day,
+        # Numeric form of poll_day for comparing against datetime.weekday()
+        "poll_weekday": DAY_MAP.get(poll_day, 4),
         "poll_time": {
-            "hour": int(settings.get('poll_time_hour', 15)),
-            "minute": int(settings.get('poll_time_minute', 0))
+            "hour": poll_hour,
+            "minute": poll_minute
         },
+        # Display form of poll_time, formatted once here instead of in every command
+        "poll_time_str": f"{poll_hour:02d}:{poll_minute:02d}",
         "saturday_war_day": settings.get('saturday_war_day', 'Saturday'),
         "saturday_war": {
             "hour": int(settings.get('saturday_war_hour', 22)),
@@ -74,3 +108,9 @@ def get_war_config(db, guild_id: int) -> dict:
 def update_war_setting(db, guild_id: int, setting: str, value):
     """Update a war configuration setting in database"""
     return db.update_server_setting(guild_id, setting, value)
+
+
+def update_war_settings(db, guild_id: int, settings: dict) -> dict | None:
+    """Update several war configuration settings in one database write; returns the new config or None on error"""
+    row = db.update_server_settings(guild_id, settings)
+    return war_config_from_settings(row) if row is not None else None
@@ -6,7 +6,8 @@ All builds and weapons are read live from the database.
 
 import discord
 import logging
-from config import get_builds_config, get_weapon_icon
+from functools import lru_cache
+from config import EMPTY_BUILD, WEAPON_ICONS, get_builds_config, get_weapon_icons, get_weapon_lines
 from utils.helpers import get_text, update_member_nickname
 
 logger = logging.getLogger(__name__)
@@ -72,9 +73,10 @@ class BuildSelectView(discord.ui.View):
                 return
 
             # Update database
-            player = self.db.get_player(user_id, guild_id)
+            player = await self.db.async_run(self.db.get_player, user_id, guild_id)
             if player:
-                success = self.db.create_or_update_player(
+                success = await self.db.async_run(
+                    self.db.create_or_update_player,
                     user_id, guild_id,
                     player['in_game_name'],
                     player['mastery_points'],
@@ -94,25 +96,21 @@ class BuildSelectView(discord.ui.View):
                 await interaction.followup.send("❌ Could not find you in the server.", ephemeral=True)
                 return
 
-            # Remove old build/weapon roles
-            from utils.helpers import remove_all_build_roles
-            await remove_all_build_roles(member, guild, self.db)
-
-            # Add new build role (try both "BuildName" and "emoji BuildName" formats)
-            builds = get_builds_config(self.db)
-            build_emoji = builds.get(build_name, {}).get("emoji", "")
+            # New build role (try both "BuildName" and "emoji BuildName" formats)
+            builds = await self.db.async_run(get_builds_config, self.db)
+            build_emoji = builds.get(build_name, EMPTY_BUILD).get("emoji", "")
+            roles_by_name = {r.name: r for r in guild.roles}
             role = (
-                discord.utils.get(guild.roles, name=build_name)
-                or discord.utils.get(guild.roles, name=f"{build_emoji} {build_name}")
+                roles_by_name.get(build_name)
+                or roles_by_name.get(f"{build_emoji} {build_name}")
             )
-            if role:
-                try:
-                    await member.add_roles(role)
-                except discord.Forbidden:
-                    pass
+
+            # Swap old build/weapon roles for the new build role in one request
+            from utils.helpers import remove_all_build_roles
+            await remove_all_build_roles(member, guild, self.db, add_roles=[role], reason="Build selected")
 
             # Clear previous weapons from database
-            self.db.set_player_weapons(user_id, guild_id, [])
+            await self.db.async_run(self.db.set_player_weapons, user_id, guild_id, [])
 
             # Disable the dropdown
             for item in self.children:
@@ -133,7 +131,7 @@ class BuildSelectView(discord.ui.View):
                 ephemeral=True
             )
         except Exception as e:
-            logger.error(f"Error in build selection: {e}", exc_info=True)
+            logger.error("Error in build selection: %s", e, exc_info=True)
             try:
                 if interaction.response.is_done():
                     await interaction.followup.send("❌ An error occurred while selecting your build. Please try again later.", ephemeral=True)
@@ -159,7 +157,8 @@ class WeaponSelectView(discord.ui.View):
         options = []
         for w in weapons_rows[:25]:
             name = w["name"]
-            icon = w.get("emoji") or get_weapon_icon(db, name)
+            # Row already came from the DB, so only the seed icons are left as a fallback
+            icon = w.get("emoji") or WEAPON_ICONS.get(name, "⚔️")
             options.append(
                 discord.SelectOption(label=name, emoji=_parse_emoji(icon), value=name)
             )
@@ -200,47 +199,37 @@ class WeaponSelectView(discord.ui.View):
                 await interaction.followup.send("❌ Could not find you in the server.", ephemeral=True)
                 return
 
-            # Get current weapons before updating
-            old_weapons = self.db.get_player_weapons(user_id, guild_id)
-
             # Save weapons to database
-            success = self.db.set_player_weapons(user_id, guild_id, weapons)
+            success = await self.db.async_run(self.db.set_player_weapons, user_id, guild_id, weapons)
             if not success:
                 await interaction.followup.send("❌ Failed to save weapons. Please try again later.", ephemeral=True)
                 return
 
-            player = self.db.get_player(user_id, guild_id)
+            player = await self.db.async_run(self.db.get_player, user_id, guild_id)
 
-            # Load all known build names from DB for role removal
-            from utils.helpers import remove_all_build_roles
-            await remove_all_build_roles(member, guild, self.db)
-
-            # Re-add current build role
-            builds = get_builds_config(self.db)
-            build_emoji = builds.get(self.build_type, {}).get("emoji", "")
+            # Current build role
+            builds = await self.db.async_run(get_builds_config, self.db)
+            build_emoji = builds.get(self.build_type, EMPTY_BUILD).get("emoji", "")
+            roles_by_name = {r.name: r for r in guild.roles}
             build_role = (
-                discord.utils.get(guild.roles, name=self.build_type)
-                or discord.utils.get(guild.roles, name=f"{build_emoji} {self.build_type}")
+                roles_by_name.get(self.build_type)
+                or roles_by_name.get(f"{build_emoji} {self.build_type}")
             )
-            if build_role:
-                try:
-                    await member.add_roles(build_role)
-                except discord.Forbidden:
-                    pass
+            roles_to_add = [build_role]
 
-            # Add new weapon roles
+            # New weapon roles
+            weapon_icons = await self.db.async_run(get_weapon_icons, self.db)
             for weapon in weapons:
-                w_row = self.db.get_weapon_by_name(weapon) or {}
-                w_emoji = w_row.get("emoji", "")
-                weapon_role = (
-                    discord.utils.get(guild.roles, name=weapon)
-                    or discord.utils.get(guild.roles, name=f"{w_emoji} {weapon}")
+                w_emoji = weapon_icons.get(weapon, "")
+                roles_to_add.append(
+                    roles_by_name.get(weapon)
+                    or roles_by_name.get(f"{w_emoji} {weapon}")
                 )
-                if weapon_role:
-                    try:
-                        await member.add_roles(weapon_role)
-                    except discord.Forbidden:
-                        pass
+
+            # Replace all build/weapon roles with the new set in a single request
+            from utils.helpers import remove_all_build_roles
+            await remove_all_build_roles(member, guild, self.db, add_roles=roles_to_add,
+                                         reason="Weapons selected")
 
             # Update nickname
             if player and player.get('in_game_name'):
@@ -254,9 +243,10 @@ class WeaponSelectView(discord.ui.View):
                 item.disabled = True
 
             # Build weapons display
-            weapons_display = "\n".join([
-                f"{get_weapon_icon(self.db, w)} {w}" for w in weapons
-            ])
+            weapon_lines = await self.db.async_run(get_weapon_lines, self.db)
+            weapons_display = "\n".join(
+                weapon_lines.get(w) or f"⚔️ {w}" for w in weapons
+            )
 
             try:
                 await interaction.edit_original_response(
@@ -274,7 +264,7 @@ class WeaponSelectView(discord.ui.View):
             )
 
         except Exception as e:
-            logger.error(f"Error in weapon selection: {e}", exc_info=True)
+            logger.error("Error in weapon selection: %s", e, exc_info=True)
             try:
                 await interaction.followup.send("❌ An error occurred. Please try again.", ephemeral=True)
             except Exception:
@@ -283,11 +273,13 @@ class WeaponSelectView(discord.ui.View):
 
 # ── Utility ──────────────────────────────────────────────────────────────────
 
+@lru_cache(maxsize=256)
 def _parse_emoji(emoji_str: str):
     """
     Convert a '<:name:id>' string to a PartialEmoji,
     or return the string as-is for unicode emoji fallback.
-    Returns None if empty.
+    Returns None if empty. Results are cached since the same
+    build/weapon emojis are parsed every time a view is built.
     """
     if not emoji_str:
         return None
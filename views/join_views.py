@@ -7,7 +7,8 @@ import discord
 from discord import ui
 from database import Database
 from config import BUILDS, BUILD_ICONS
-from utils.helpers import get_text
+from utils.helpers import get_text, invalidate_lang_cache
+from views.profile_views import LANGUAGE_SELECT_OPTIONS
 import logging
 
 logger = logging.getLogger(__name__)
@@ -42,13 +43,13 @@ class JoinRequestButton(ui.View):
             await interaction.response.send_modal(modal)
             
         except Exception as e:
-            logger.error(f"Error in join request button: {e}", exc_info=True)
+            logger.error("Error in join request button: %s", e, exc_info=True)
             try:
                 await interaction.response.send_message(
                     "❌ حدث خطأ. يرجى المحاولة مرة أخرى لاحقاً.",  # "An error occurred. Please try again later."
                     ephemeral=True
                 )
-            except:
+            except (discord.HTTPException, discord.InteractionResponded):
                 pass
 
 
@@ -74,26 +75,11 @@ class JoinLanguageDropdown(ui.Select):
         self.db = db
         self.LANGUAGES = LANGUAGES
         
-        options = [
-            discord.SelectOption(
-                label="English",
-                value="en",
-                emoji="🇬🇧",
-                description="Select English language"
-            ),
-            discord.SelectOption(
-                label="العربية",
-                value="ar",
-                emoji="🇸🇦",
-                description="اختر اللغة العربية"
-            )
-        ]
-        
         super().__init__(
             placeholder="Choose your language / اختر لغتك",
             min_values=1,
             max_values=1,
-            options=options
+            options=list(LANGUAGE_SELECT_OPTIONS)
         )
     
     async def callback(self, interaction: discord.Interaction):
@@ -102,20 +88,21 @@ class JoinLanguageDropdown(ui.Select):
             language = self.values[0]
             
             # Set user language preference (fast DB call, do it first)
-            self.db.set_user_language(self.user_id, self.guild_id, language)
+            await self.db.async_run(self.db.set_user_language, self.user_id, self.guild_id, language)
+            invalidate_lang_cache(self.user_id, self.guild_id)
             
             # Send modal - no extra edit call needed
             modal = JoinRequestModal(self.guild_id, self.user_id, language, self.db, self.LANGUAGES)
             await interaction.response.send_modal(modal)
             
         except Exception as e:
-            logger.error(f"Error showing join modal: {e}", exc_info=True)
+            logger.error("Error showing join modal: %s", e, exc_info=True)
             try:
                 await interaction.response.send_message(
                     "❌ An error occurred. Please try again later.",
                     ephemeral=True
                 )
-            except:
+            except (discord.HTTPException, discord.InteractionResponded):
                 pass
 
 
@@ -175,7 +162,7 @@ class JoinRequestModal(ui.Modal):
                 return
             
             # Get join settings
-            settings = self.db.get_join_settings(self.guild_id)
+            settings = await self.db.async_run(self.db.get_join_settings, self.guild_id)
             if not settings:
                 error_msg = get_text(self.db, self.LANGUAGES, self.guild_id, "join_not_setup", self.user_id)
                 await interaction.followup.send(error_msg, ephemeral=True)
@@ -187,12 +174,14 @@ class JoinRequestModal(ui.Modal):
             # Check power requirement
             if power < min_power:
                 # Auto-reject
-                request_id = self.db.create_join_request(
+                request_id = await self.db.async_run(
+                    self.db.create_join_request,
                     self.user_id, self.guild_id, self.language,
                     in_game_name, level, power
                 )
                 if request_id:
-                    self.db.update_join_request_status(
+                    await self.db.async_run(
+                        self.db.update_join_request_status,
                         request_id, "auto_rejected", None
                     )
                 
@@ -227,7 +216,8 @@ class JoinRequestModal(ui.Modal):
             admin_message = await admin_channel.send(embed=embed, view=view)
             
             # Create join request in database
-            request_id = self.db.create_join_request(
+            request_id = await self.db.async_run(
+                self.db.create_join_request,
                 self.user_id, self.guild_id, self.language,
                 in_game_name, level, power, admin_message.id
             )
@@ -240,13 +230,13 @@ class JoinRequestModal(ui.Modal):
             await interaction.followup.send(success_msg, ephemeral=True)
             
         except Exception as e:
-            logger.error(f"Error in join request submission: {e}", exc_info=True)
+            logger.error("Error in join request submission: %s", e, exc_info=True)
             try:
                 await interaction.followup.send(
                     "❌ An error occurred. Please try again later.",
                     ephemeral=True
                 )
-            except:
+            except discord.HTTPException:
                 pass
 
 
@@ -268,24 +258,17 @@ class AdminApprovalView(ui.View):
         try:
             # Update join request status and create profile
             if self.request_id:
-                self.db.update_join_request_status(self.request_id, "approved", interaction.user.id)
+                await self.db.async_run(
+                    self.db.update_join_request_status, self.request_id, "approved", interaction.user.id
+                )
                 
                 # Get request data to create profile
-                with self.db.get_connection() as conn:
-                    from psycopg2.extras import RealDictCursor
-                    cursor = conn.cursor(cursor_factory=RealDictCursor)
-                    cursor.execute("""
-                        SELECT in_game_name, level, power 
-                        FROM join_requests 
-                        WHERE id = %s
-                    """, (self.request_id,))
-                    request_data = cursor.fetchone()
-                
+                request_data = await self.db.async_run(self.db.get_join_request, self.request_id)
                 
                 if request_data:
                     # Create basic profile with join request data
-                    
-                    success = self.db.create_or_update_player(
+                    success = await self.db.async_run(
+                        self.db.create_or_update_player,
                         self.user_id,
                         self.guild_id,
                         request_data['in_game_name'],
@@ -293,6 +276,9 @@ class AdminApprovalView(ui.View):
                         request_data['level'],
                         "DPS"  # Default build, user will change it
                     )
+                    if success:
+                        from cogs.profile import invalidate_rank_cache
+                        invalidate_rank_cache(self.guild_id)
                     
                     # Assign 'AK | Member' role to the user
                     try:
@@ -306,14 +292,14 @@ class AdminApprovalView(ui.View):
                             if member_role:
                                 await member.add_roles(member_role, reason="Join request approved")
                             else:
-                                logger.warning(f"'AK | Member' role not found in guild {self.guild_id}")
+                                logger.warning("'AK | Member' role not found in guild %s", self.guild_id)
                         else:
-                            logger.warning(f"Member {self.user_id} not found in guild {self.guild_id}")
+                            logger.warning("Member %s not found in guild %s", self.user_id, self.guild_id)
                     except Exception as e:
-                        logger.error(f"Error assigning role to user {self.user_id}: {e}", exc_info=True)
+                        logger.error("Error assigning role to user %s: %s", self.user_id, e, exc_info=True)
                     
                 else:
-                    logger.error(f"No request data found for request_id {self.request_id}")
+                    logger.error("No request data found for request_id %s", self.request_id)
             
             # Update embed
             embed = interaction.message.embeds[0]
@@ -331,7 +317,7 @@ class AdminApprovalView(ui.View):
             await interaction.response.edit_message(embed=embed, view=self)
             
             # Get the join settings to find the build setup channel
-            settings = self.db.get_join_settings(self.guild_id)
+            settings = await self.db.async_run(self.db.get_join_settings, self.guild_id)
             build_setup_channel_id = settings.get('build_setup_channel_id') if settings else None
             join_channel_id = settings.get('join_channel_id') if settings else None
             
@@ -365,10 +351,10 @@ class AdminApprovalView(ui.View):
                         f"🎉 {member.mention} **{approval_msg}**\n\n"
                         f"Please go to {channel_mention} and click the **'Setup Profile'** button to complete your profile setup!"
                     )
-                    logger.warning(f"Could not DM user {self.user_id}, sent message in channel instead")
+                    logger.warning("Could not DM user %s, sent message in channel instead", self.user_id)
             
         except Exception as e:
-            logger.error(f"Error in approval: {e}", exc_info=True)
+            logger.error("Error in approval: %s", e, exc_info=True)
     
     @ui.button(label="❌ Reject", style=discord.ButtonStyle.danger, custom_id="reject_join")
     async def reject_button(self, interaction: discord.Interaction, button: ui.Button):
@@ -382,7 +368,7 @@ class AdminApprovalView(ui.View):
             await interaction.response.send_modal(modal)
             
         except Exception as e:
-            logger.error(f"Error in rejection: {e}", exc_info=True)
+            logger.error("Error in rejection: %s", e, exc_info=True)
 
 
 class RejectionReasonModal(ui.Modal):
@@ -413,7 +399,9 @@ class RejectionReasonModal(ui.Modal):
             
             # Update request status
             if self.request_id:
-                self.db.update_join_request_status(self.request_id, "rejected", interaction.user.id, reason)
+                await self.db.async_run(
+                    self.db.update_join_request_status, self.request_id, "rejected", interaction.user.id, reason
+                )
             
             # Update embed
             embed = interaction.message.embeds[0]
@@ -443,7 +431,7 @@ class RejectionReasonModal(ui.Modal):
                 try:
                     await member.send(reject_msg)
                 except discord.Forbidden:
-                    logger.warning(f"Could not DM user {self.user_id} for rejection notification")
+                    logger.warning("Could not DM user %s for rejection notification", self.user_id)
             
         except Exception as e:
-            logger.error(f"Error in rejection reason submission: {e}", exc_info=True)
+            logger.error("Error in rejection reason submission: %s", e, exc_info=True)
@@ -5,8 +5,25 @@ Handles language selection, profile setup button, and complete profile modal.
 
 import discord
 from config import get_builds_config
-from utils.helpers import get_text, update_member_nickname
-from locales import LANGUAGES
+from utils.helpers import get_text, update_member_nickname, invalidate_lang_cache
+from locales import LANGUAGES, LANGUAGES_FLAT
+
+# Language dropdown options are static; build them once and share them
+# between every language picker (profile setup and join requests).
+LANGUAGE_SELECT_OPTIONS = (
+    discord.SelectOption(
+        label="English",
+        value="en",
+        emoji="🇬🇧",
+        description="Select English language"
+    ),
+    discord.SelectOption(
+        label="العربية",
+        value="ar",
+        emoji="🇸🇦",
+        description="اختر اللغة العربية"
+    ),
+)
 
 
 class LanguageSelectView(discord.ui.View):
@@ -28,26 +45,11 @@ class LanguageDropdown(discord.ui.Select):
         self.db = db
         self.LANGUAGES = LANGUAGES
         
-        options = [
-            discord.SelectOption(
-                label="English",
-                value="en",
-                emoji="🇬🇧",
-                description="Select English language"
-            ),
-            discord.SelectOption(
-                label="العربية",
-                value="ar",
-                emoji="🇸🇦",
-                description="اختر اللغة العربية"
-            )
-        ]
-        
         super().__init__(
             placeholder="Choose your language / اختر لغتك",
             min_values=1,
             max_values=1,
-            options=options
+            options=list(LANGUAGE_SELECT_OPTIONS)
         )
     
     async def callback(self, interaction: discord.Interaction):
@@ -57,7 +59,8 @@ class LanguageDropdown(discord.ui.Select):
             lang = self.values[0]
             
             # Save language preference BEFORE sending modal (fast DB call)
-            self.db.set_user_language(user_id, guild_id, lang)
+            await self.db.async_run(self.db.set_user_language, user_id, guild_id, lang)
+            invalidate_lang_cache(user_id, guild_id)
             
             # Send modal IMMEDIATELY - no extra edit call needed
             modal = CompleteProfileModal(guild_id, user_id, self.db, self.LANGUAGES)
@@ -71,7 +74,7 @@ class LanguageDropdown(discord.ui.Select):
                     "❌ An error occurred. Please try again later.",
                     ephemeral=True
                 )
-            except:
+            except (discord.HTTPException, discord.InteractionResponded):
                 pass
 
 
@@ -82,7 +85,7 @@ class ProfileSetupButton(discord.ui.View):
         self.db = db
         self.LANGUAGES = LANGUAGES
         self.guild_id = guild_id
-        label = get_text(db, LANGUAGES, guild_id, "setup_profile_btn") if guild_id is not None else LANGUAGES["en"].get("setup_profile_btn", "📝 Setup Your Profile")
+        label = get_text(db, LANGUAGES, guild_id, "setup_profile_btn") if guild_id is not None else LANGUAGES_FLAT.get(("en", "setup_profile_btn"), "📝 Setup Your Profile")
         btn = discord.ui.Button(
             label=label,
             style=discord.ButtonStyle.primary,
@@ -110,7 +113,7 @@ class ProfileSetupButton(discord.ui.View):
                     "❌ An error occurred. Please try again later.",
                     ephemeral=True
                 )
-            except:
+            except (discord.HTTPException, discord.InteractionResponded):
                 pass
 
 
@@ -173,21 +176,22 @@ class CompleteProfileModal(discord.ui.Modal):
                 return
             
             # Default to first build in DB (or 'DPS' if none)
-            builds = get_builds_config(self.db)
+            builds = await self.db.async_run(get_builds_config, self.db)
             default_build = next(iter(builds), "DPS")
-            self.db.create_or_update_player(
+            await self.db.async_run(
+                self.db.create_or_update_player,
                 user_id, guild_id,
                 ign_value,
                 mastery_val,
                 level_val,
                 default_build
             )
+            from cogs.profile import invalidate_rank_cache
+            invalidate_rank_cache(guild_id)
             
             member = interaction.user
             nickname_success, nickname_msg = await update_member_nickname(member, ign_value)
             
-            build_view = BuildSelectView(self.db, self.LANGUAGES)
-            
             # Send build selection directly without showing profile created message
             # This keeps the chat clean
             build_msg = get_text(self.db, self.LANGUAGES, guild_id, 'now_select_build', user_id)